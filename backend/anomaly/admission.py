@@ -0,0 +1,330 @@
+# admission.py
+"""
+Admission control for the inference endpoints.
+
+Every POST to /predict* is costed from its Content-Length alone and classed
+by X-Priority: urgent (police submissions), normal, or bulk. Media duration is
+not used: the proxy streams uploads through without decoding them, so the only
+size known before the body arrives is its byte count. X-Priority is only
+trusted from the proxy that sets it (server.js, which derives it from the
+caller's JWT); anyone else asking for urgent is treated as normal, though a
+downgrade to bulk is always honoured. The request is then either started,
+queued behind work of the same or higher priority, or rejected straight away
+with 503 and a Retry-After estimate. All of this happens before the body is
+read, so a shed request never reaches TMP_DIR.
+
+Limits (per worker process):
+  ADMISSION_MAX_CONCURRENT      requests running inference at once (default 2)
+  ADMISSION_URGENT_SLOTS        of those, slots only urgent requests may use (default 1)
+  ADMISSION_QUEUE_URGENT / _NORMAL / _BULK   max waiting requests per class (32 / 16 / 8)
+  ADMISSION_MAX_INFLIGHT_MB     bytes admitted (queued + running) at once (default 1024);
+                                normal/bulk may only use ADMISSION_SHARED_BYTES_FRACTION of it (0.8)
+  ADMISSION_QUEUE_TIMEOUT       seconds a request may wait before it is shed (default 120)
+  ADMISSION_DRAIN_MAX_MB        body bytes discarded before answering a shed request (default 64),
+                                so the client reads the 503 rather than a reset connection
+  ADMISSION=0                   disable
+
+Trusted proxies (who may send X-Priority: urgent):
+  ADMISSION_TRUSTED_PROXIES     comma-separated peer addresses or CIDRs (default 127.0.0.1,::1)
+  ADMISSION_PROXY_SECRET        shared secret; a request whose X-Proxy-Secret header matches is
+                                trusted from any address (server.js sends ANOMALY_PROXY_SECRET)
+
+Requests larger than the whole byte budget get 413. GET /admission reports
+queue depths, in-flight bytes, shed counts and queue-wait percentiles.
+
+Dispatch is strict priority, and the reserved slots and byte headroom mean a
+backlog of large bulk videos cannot delay urgent requests by more than one
+request's service time.
+"""
+import os
+import hmac
+import json
+import math
+import time
+import asyncio
+import logging
+import ipaddress
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+PRIORITIES = ("urgent", "normal", "bulk")
+_ALIASES = {"high": "urgent", "police": "urgent", "low": "bulk", "batch": "bulk"}
+
+
+def parse_priority(value: Optional[str]) -> str:
+    value = (value or "").strip().lower()
+    value = _ALIASES.get(value, value)
+    return value if value in PRIORITIES else "normal"
+
+
+class Rejected(Exception):
+    """Request shed by admission control"""
+
+    def __init__(self, reason: str, retry_after: Optional[int], status: int = 503):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.status = status
+
+
+class Ticket:
+    __slots__ = ("priority", "nbytes", "est_s", "enqueued", "started", "future")
+
+    def __init__(self, priority: str, nbytes: int, est_s: float):
+        self.priority = priority
+        self.nbytes = nbytes
+        self.est_s = est_s
+        self.enqueued = time.monotonic()
+        self.started: Optional[float] = None
+        self.future: Optional[asyncio.Future] = None
+
+
+class AdmissionController:
+    """
+    Priority queues with bounded depth, concurrency and in-flight bytes.
+
+    Runs on a single event loop (one per worker), so state needs no locks.
+    A fixed overhead and the service time per MB are learned from completed
+    requests (EWMA) to cost new ones and to compute Retry-After.
+    """
+
+    def __init__(self, max_concurrent: int = 2, urgent_slots: int = 1,
+                 queue_depth: Optional[Dict[str, int]] = None, max_inflight_bytes: int = 1024 * 2 ** 20,
+                 shared_bytes_fraction: float = 0.8, queue_timeout: float = 120.0,
+                 unknown_size_bytes: int = 64 * 2 ** 20):
+        self.max_concurrent = max(1, max_concurrent)
+        self.urgent_slots = min(max(0, urgent_slots), self.max_concurrent - 1) if self.max_concurrent > 1 else 0
+        self.queue_depth = {"urgent": 32, "normal": 16, "bulk": 8, **(queue_depth or {})}
+        self.max_inflight_bytes = max_inflight_bytes
+        self.shared_bytes = int(max_inflight_bytes * shared_bytes_fraction)
+        self.queue_timeout = queue_timeout
+        self.unknown_size_bytes = unknown_size_bytes
+        self.queues: Dict[str, Deque[Ticket]] = {p: deque() for p in PRIORITIES}
+        self.running: List[Ticket] = []
+        self.inflight_bytes = 0
+        # learned service cost; start with 2 s + 0.1 s/MB until real samples arrive
+        self.base_s = 2.0
+        self.s_per_mb = 0.1
+        self.stats = {p: {"admitted": 0, "rejected": 0, "timed_out": 0, "completed": 0} for p in PRIORITIES}
+        self._waits: Dict[str, Deque[float]] = {p: deque(maxlen=1000) for p in PRIORITIES}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        env = os.environ.get
+        return cls(
+            max_concurrent=int(env("ADMISSION_MAX_CONCURRENT", 2)),
+            urgent_slots=int(env("ADMISSION_URGENT_SLOTS", 1)),
+            queue_depth={p: int(env(f"ADMISSION_QUEUE_{p.upper()}", d))
+                         for p, d in (("urgent", 32), ("normal", 16), ("bulk", 8))},
+            max_inflight_bytes=int(float(env("ADMISSION_MAX_INFLIGHT_MB", 1024)) * 2 ** 20),
+            shared_bytes_fraction=float(env("ADMISSION_SHARED_BYTES_FRACTION", 0.8)),
+            queue_timeout=float(env("ADMISSION_QUEUE_TIMEOUT", 120)),
+        )
+
+    # ---- costing ------------------------------------------------------------
+
+    def estimate_seconds(self, nbytes: int) -> float:
+        return self.base_s + nbytes / 2 ** 20 * self.s_per_mb
+
+    def _observe(self, ticket: Ticket, elapsed: float) -> None:
+        alpha = 0.2
+        mb = ticket.nbytes / 2 ** 20
+        if mb >= 1:
+            self.s_per_mb += alpha * (max(0.0, elapsed - self.base_s) / mb - self.s_per_mb)
+        else:
+            self.base_s += alpha * (elapsed - self.base_s)
+
+    def _retry_after(self, priority: str) -> int:
+        """Seconds until a new request of this priority would likely get a slot"""
+        ahead = sum(t.est_s for p in PRIORITIES[:PRIORITIES.index(priority) + 1] for t in self.queues[p])
+        ahead += sum(t.est_s - (time.monotonic() - t.started) for t in self.running if t.started)
+        return int(min(300, max(1, math.ceil(ahead / self.max_concurrent))))
+
+    # ---- admission ----------------------------------------------------------
+
+    def _slots_for(self, priority: str) -> int:
+        return self.max_concurrent if priority == "urgent" else self.max_concurrent - self.urgent_slots
+
+    def _bytes_limit(self, priority: str) -> int:
+        return self.max_inflight_bytes if priority == "urgent" else self.shared_bytes
+
+    def admit(self, priority: str, nbytes: Optional[int]) -> Ticket:
+        """Queue a request or raise Rejected; call before reading the body"""
+        nbytes = self.unknown_size_bytes if nbytes is None else nbytes
+        if nbytes > self.max_inflight_bytes:
+            self.stats[priority]["rejected"] += 1
+            raise Rejected("Request larger than the admission byte budget", None, status=413)
+        if len(self.queues[priority]) >= self.queue_depth[priority]:
+            self.stats[priority]["rejected"] += 1
+            raise Rejected(f"{priority} queue is full", self._retry_after(priority))
+        if self.inflight_bytes + nbytes > self._bytes_limit(priority):
+            self.stats[priority]["rejected"] += 1
+            raise Rejected("Too many bytes in flight", self._retry_after(priority))
+        ticket = Ticket(priority, nbytes, self.estimate_seconds(nbytes))
+        ticket.future = asyncio.get_running_loop().create_future()
+        self.inflight_bytes += nbytes
+        self.queues[priority].append(ticket)
+        self.stats[priority]["admitted"] += 1
+        self._dispatch()
+        return ticket
+
+    def _dispatch(self) -> None:
+        for priority in PRIORITIES:
+            queue = self.queues[priority]
+            while queue and len(self.running) < self._slots_for(priority):
+                ticket = queue.popleft()
+                if ticket.future.done():  # cancelled while waiting
+                    continue
+                ticket.started = time.monotonic()
+                self.running.append(ticket)
+                self._waits[priority].append(ticket.started - ticket.enqueued)
+                ticket.future.set_result(None)
+
+    async def wait(self, ticket: Ticket) -> None:
+        """Wait for a slot; raises Rejected when the queue timeout passes first"""
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if ticket.future.done():
+                return  # granted in the same tick as the timeout
+            self._abandon(ticket)
+            self.stats[ticket.priority]["timed_out"] += 1
+            raise Rejected("Timed out waiting in queue", self._retry_after(ticket.priority))
+        except asyncio.CancelledError:
+            if ticket.future.done():
+                self.release(ticket)
+            else:
+                self._abandon(ticket)
+            raise
+
+    def _abandon(self, ticket: Ticket) -> None:
+        ticket.future.cancel()
+        try:
+            self.queues[ticket.priority].remove(ticket)
+        except ValueError:
+            pass
+        self.inflight_bytes -= ticket.nbytes
+
+    def release(self, ticket: Ticket) -> None:
+        if ticket not in self.running:
+            return
+        self.running.remove(ticket)
+        self.inflight_bytes -= ticket.nbytes
+        self.stats[ticket.priority]["completed"] += 1
+        self._observe(ticket, time.monotonic() - ticket.started)
+        self._dispatch()
+
+    def snapshot(self) -> Dict[str, Any]:
+        def pct(values, q):
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 1) if values else None
+        return {
+            "pid": os.getpid(),
+            "running": len(self.running),
+            "max_concurrent": self.max_concurrent,
+            "urgent_slots": self.urgent_slots,
+            "inflight_mb": round(self.inflight_bytes / 2 ** 20, 1),
+            "max_inflight_mb": round(self.max_inflight_bytes / 2 ** 20, 1),
+            "queued": {p: len(q) for p, q in self.queues.items()},
+            "queue_depth": self.queue_depth,
+            "estimate": {"base_s": round(self.base_s, 3), "s_per_mb": round(self.s_per_mb, 4)},
+            "stats": self.stats,
+            "queue_wait_ms": {p: {"p50": pct(w, 0.5), "p99": pct(w, 0.99)} for p, w in self._waits.items()},
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to POSTs under the given path prefixes"""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None, prefixes=("/predict",),
+                 drain_max_bytes: Optional[int] = None, trusted_proxies: Optional[str] = None,
+                 proxy_secret: Optional[str] = None):
+        self.app = app
+        self.controller = controller or AdmissionController.from_env()
+        self.prefixes = tuple(prefixes)
+        self.enabled = os.environ.get("ADMISSION", "1") != "0"
+        if drain_max_bytes is None:
+            drain_max_bytes = int(float(os.environ.get("ADMISSION_DRAIN_MAX_MB", 64)) * 2 ** 20)
+        self.drain_max_bytes = drain_max_bytes
+        if trusted_proxies is None:
+            trusted_proxies = os.environ.get("ADMISSION_TRUSTED_PROXIES", "127.0.0.1,::1")
+        self.trusted_proxies = [ipaddress.ip_network(p.strip(), strict=False)
+                                for p in trusted_proxies.split(",") if p.strip()]
+        if proxy_secret is None:
+            proxy_secret = os.environ.get("ADMISSION_PROXY_SECRET", "")
+        self.proxy_secret = proxy_secret.encode()
+
+    def _trusted(self, scope, headers: Dict[str, str]) -> bool:
+        """Whether the peer is a proxy allowed to raise a request's priority"""
+        secret = headers.get("x-proxy-secret")
+        if self.proxy_secret and secret is not None:
+            return hmac.compare_digest(secret.encode("latin-1"), self.proxy_secret)
+        client = scope.get("client")
+        if not client:
+            return False
+        try:
+            peer = ipaddress.ip_address(client[0])
+        except ValueError:
+            return False
+        return any(peer in net for net in self.trusted_proxies)
+
+    def _priority(self, scope, headers: Dict[str, str]) -> str:
+        priority = parse_priority(headers.get("x-priority"))
+        if priority == "urgent" and not self._trusted(scope, headers):
+            log.debug("Ignoring X-Priority: urgent from untrusted peer %s", scope.get("client"))
+            return "normal"
+        return priority
+
+    async def _drain(self, receive, headers: Dict[str, str]) -> None:
+        """
+        Discard the body of a shed request so the client sees the 503 instead of a
+        connection reset. Clients sending Expect: 100-continue never upload it, and
+        bodies over drain_max_bytes are cut off by closing the connection.
+        """
+        if "100-continue" in headers.get("expect", "").lower():
+            return
+        seen = 0
+        while seen <= self.drain_max_bytes:
+            message = await receive()
+            if message["type"] != "http.request":
+                return
+            seen += len(message.get("body", b""))
+            if not message.get("more_body"):
+                return
+
+    async def _reject(self, receive, send, headers: Dict[str, str], err: Rejected, priority: str) -> None:
+        log.warning("Shed %s request: %s (retry after %ss)", priority, err.reason, err.retry_after)
+        await self._drain(receive, headers)
+        body = json.dumps({"detail": err.reason, "retry_after": err.retry_after}).encode()
+        response_headers = [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode()),
+                            (b"connection", b"close")]
+        if err.retry_after is not None:
+            response_headers.append((b"retry-after", str(err.retry_after).encode()))
+        await send({"type": "http.response.start", "status": err.status, "headers": response_headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if (not self.enabled or scope["type"] != "http" or scope["method"] != "POST"
+                or not scope["path"].startswith(self.prefixes)):
+            await self.app(scope, receive, send)
+            return
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        priority = self._priority(scope, headers)
+        try:
+            nbytes = int(headers["content-length"]) if "content-length" in headers else None
+        except ValueError:
+            nbytes = None
+
+        try:
+            ticket = self.controller.admit(priority, nbytes)
+            await self.controller.wait(ticket)
+        except Rejected as e:
+            await self._reject(receive, send, headers, e, priority)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(ticket)
@@ -1,19 +1,36 @@
 # app.py
 import os
+import time
 import logging
+from typing import List
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
-from .utils import save_upload_file, cleanup_file, make_job_outdir, is_video_file
-from .detect_ucf_i3d import predict as predict_ucf
-from .detect_yolo import predict as predict_yolo
-from .detect_onnx import predict as predict_onnx
+from .utils import save_upload_file, cleanup_file, make_job_outdir, is_video_file, decode_images
+# Detector modules (and torch/ultralytics/onnxruntime) are imported on first use, see plugins.py
+from .plugins import DetectorDisabled, enabled_detectors, get_detector, plugin_report
+from .admission import AdmissionController, AdmissionMiddleware
+from . import governor
 
 log = logging.getLogger("anomaly_app")
 logging.basicConfig(level=logging.INFO)
 
 app = FastAPI(title="JusticeChain Anomaly Detection")
+# Upper bound on images in one /predict/shoplifting/batch request
+BATCH_MAX_IMAGES = int(os.environ.get("ANOMALY_BATCH_MAX_IMAGES", 256))
+
+log.info("Anomaly detectors enabled on this worker: %s", ", ".join(enabled_detectors()) or "none")
+# Size torch/ORT/cv2 thread pools for this worker before any detector loads
+governor.apply(enabled_detectors())
+
+
+def _detector(name: str):
+    try:
+        return get_detector(name)
+    except DetectorDisabled as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 # Allow CORS from the Node server (adjust origins as needed)
 origins = [
@@ -21,6 +38,9 @@ origins = [
     "http://localhost:3000",
     "http://127.0.0.1:3000"
 ]
+# Added first so it runs inside CORS: 503 load-shedding responses still carry CORS headers
+admission = AdmissionController.from_env()
+app.add_middleware(AdmissionMiddleware, controller=admission)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=os.environ.get("CORS_ORIGINS", ",".join(origins)).split(","),
@@ -35,12 +55,14 @@ async def predict(file: UploadFile = File(...), threshold: float = Form(0.3), sa
     Automatic anomaly (UCF/I3D) prediction endpoint.
     Accepts multipart file field `file`. Returns JSON with UCF/anomaly results and hints for next steps.
     """
+    detector = _detector("ucf")
     saved_path = None
     try:
-        saved_path = save_upload_file(file)
+        saved_path = await run_in_threadpool(save_upload_file, file)
         log.info("Saved upload to %s", saved_path)
 
-        ucf_result = predict_ucf(saved_path)
+        # Off the event loop, so admission control keeps answering while inference runs
+        ucf_result = await run_in_threadpool(detector.predict, saved_path)
         response = {
             "status": "ok",
             "method": "ucf_i3d",
@@ -67,12 +89,13 @@ async def predict_shoplifting(file: UploadFile = File(...), conf: float = Form(0
     """
     Shoplifting detection using YOLO model (.pt)
     """
+    detector = _detector("shoplifting")
     saved_path = None
     try:
-        saved_path = save_upload_file(file)
+        saved_path = await run_in_threadpool(save_upload_file, file)
         log.info("Saved shoplifting upload to %s", saved_path)
         outdir = make_job_outdir("shoplifting")
-        res = predict_yolo(saved_path, conf=conf, save_txt=save_txt)
+        res = await run_in_threadpool(detector.predict, saved_path, conf=conf, save_txt=save_txt)
         return {"status": "ok", "method": "yolo_shoplifting", "outdir": outdir, "result": res}
     except Exception as e:
         log.exception("Error in /predict/shoplifting: %s", e)
@@ -83,17 +106,77 @@ async def predict_shoplifting(file: UploadFile = File(...), conf: float = Form(0
         except Exception:
             pass
 
+@app.post("/predict/shoplifting/batch")
+async def predict_shoplifting_batch(files: List[UploadFile] = File(...), conf: float = Form(0.25),
+                                    batch_size: int = Form(0)):
+    """
+    Shoplifting detection on many images at once (e.g. frame dumps from a DVR export).
+    Accepts repeated multipart field `files`; images go through YOLO in real batches.
+    Returns one entry per file, in upload order; a file that can't be decoded or
+    fails in the model gets an "error" instead of failing the whole request.
+    """
+    detector = _detector("shoplifting")
+    if len(files) > BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_IMAGES} images per request")
+    started = time.perf_counter()
+    results = []
+    try:
+        module = await run_in_threadpool(detector.load)
+        # A client may ask for smaller batches, never for more memory than YOLO_BATCH_SIZE allows
+        size = min(batch_size, module.BATCH_SIZE) if batch_size > 0 else module.BATCH_SIZE
+        # Read, decode and run one model batch at a time, so at most `size`
+        # payloads and decoded images are held in memory, not the whole request
+        for start in range(0, len(files), size):
+            chunk = files[start:start + size]
+            payloads = []
+            for f in chunk:
+                payloads.append(await f.read())
+                await f.close()
+            images = await run_in_threadpool(decode_images, payloads)
+            del payloads
+            readable = [i for i, img in enumerate(images) if img is not None]
+            res = await run_in_threadpool(
+                module.predict_images, [images[i] for i in readable], conf=conf, batch_size=size)
+            del images
+            # Undecodable or failed images get an error entry; the rest of the batch still succeeds
+            per_image = dict(zip(readable, zip(res["detections"], res.get("errors") or [None] * len(readable))))
+            for i, f in enumerate(chunk):
+                if i not in per_image:
+                    results.append({"filename": f.filename, "detections": [], "error": "Could not decode image"})
+                    continue
+                detections, error = per_image[i]
+                entry = {"filename": f.filename, "detections": detections}
+                if error:
+                    entry["error"] = f"Detection failed: {error}"
+                results.append(entry)
+    except Exception as e:
+        log.exception("Error in /predict/shoplifting/batch: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    elapsed = time.perf_counter() - started
+    return {
+        "status": "ok",
+        "method": "yolo_shoplifting_batch",
+        "model_loaded": res["model_loaded"],
+        "model_path": res["model_path"],
+        "images": len(files),
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "images_per_s": round(len(files) / elapsed, 1) if elapsed > 0 else None,
+        "results": results,
+    }
+
 @app.post("/predict/weapon")
 async def predict_weapon(file: UploadFile = File(...), conf: float = Form(0.25), save_txt: bool = Form(False)):
     """
     Weapon detection using ONNX model
     """
+    detector = _detector("weapon")
     saved_path = None
     try:
-        saved_path = save_upload_file(file)
+        saved_path = await run_in_threadpool(save_upload_file, file)
         log.info("Saved weapon upload to %s", saved_path)
         outdir = make_job_outdir("weapon")
-        res = predict_onnx(saved_path, conf=conf, save_txt=save_txt)
+        res = await run_in_threadpool(detector.predict, saved_path, conf=conf, save_txt=save_txt)
         return {"status": "ok", "method": "onnx_weapon", "outdir": outdir, "result": res}
     except Exception as e:
         log.exception("Error in /predict/weapon: %s", e)
@@ -104,6 +187,20 @@ async def predict_weapon(file: UploadFile = File(...), conf: float = Form(0.25),
         except Exception:
             pass
 
+@app.get("/detectors")
+async def detectors():
+    """
+    Detectors hosted by this worker, with per-plugin import/model-load time and memory
+    """
+    return {**plugin_report(), "thread_budget": governor.budget()}
+
+@app.get("/admission")
+async def admission_status():
+    """
+    Queue depths, in-flight bytes, shed counts and queue wait percentiles per priority
+    """
+    return admission.snapshot()
+
 # Basic root
 @app.get("/")
 async def root():
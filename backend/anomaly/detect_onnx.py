@@ -27,6 +27,7 @@ except Exception:
 
 _model_sess = None
 _model_path = None
+_runner = None
 
 def find_model_file() -> str:
     for p in DEFAULT_MODEL_PATHS:
@@ -35,7 +36,7 @@ def find_model_file() -> str:
     return None
 
 def load_model():
-    global _model_sess, _model_path
+    global _model_sess, _model_path, _runner
     if _model_sess is not None:
         return _model_sess
     path = find_model_file()
@@ -47,7 +48,10 @@ def load_model():
         log.warning("onnxruntime not installed; install onnxruntime to enable ONNX inference.")
         return None
     try:
-        sess = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+        from .governor import ort_session_options
+        sess = ort.InferenceSession(path, sess_options=ort_session_options(ort), providers=['CPUExecutionProvider'])
+        from .preprocess import OrtRunner
+        _runner = OrtRunner(sess)
         _model_sess = sess
         log.info("Loaded ONNX model from %s", path)
         return sess
@@ -56,25 +60,25 @@ def load_model():
         _model_sess = None
         return None
 
-def preprocess_image_for_onnx(img_path: str):
-    """
-    Very simple preprocessing: read image, resize to 640x640, transpose to NCHW, normalize.
-    Adjust to your model's preprocessing.
-    """
+def read_image(img_path: str):
     import cv2
-    import numpy as np
     img = cv2.imread(img_path)
     if img is None:
         raise RuntimeError(f"Could not read {img_path}")
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    img = cv2.resize(img, (640, 640))
-    img = img.astype("float32") / 255.0
-    # HWC -> CHW
-    img = img.transpose(2, 0, 1)
-    # add batch
-    img = img[None, ...]
     return img
 
+def preprocess_image_for_onnx(img_path: str, size=(640, 640)):
+    """
+    Read an image and letterbox it to a normalized 1x3xHxW RGB float32 array.
+    predict() does the same into pooled buffers (see preprocess.py); this returns a fresh array.
+    Adjust to your model's preprocessing.
+    """
+    import numpy as np
+    from .preprocess import preprocess_into
+    out = np.empty((1, 3) + tuple(size), dtype=np.float32)
+    preprocess_into(read_image(img_path), out)
+    return out
+
 def parse_onnx_outputs(outputs) -> List[Dict[str, Any]]:
     """
     Generic parser: this highly depends on model. We'll attempt best-effort to parse bounding boxes + scores.
@@ -121,10 +125,18 @@ def predict(file_path: str, conf: float = 0.25, save_txt: bool = False) -> Dict[
             "note": "ONNX runtime or model unavailable — returned stub"
         }
     try:
-        inp = preprocess_image_for_onnx(file_path)
-        ort_inputs = {sess.get_inputs()[0].name: inp}
-        outputs = sess.run(None, ort_inputs)
+        img = read_image(file_path)
+        # Letterboxed into a pooled buffer and bound to the session without a copy
+        outputs, (scale, top, left) = _runner.run_image(img)
         dets = parse_onnx_outputs(outputs)
+        boxed = [d for d in dets if "xyxy" in d]
+        if boxed:
+            import numpy as np
+            from .preprocess import unletterbox_xyxy
+            xyxy = unletterbox_xyxy(np.array([d["xyxy"] for d in boxed], dtype=np.float32),
+                                    scale, top, left, img.shape[:2])
+            for d, box in zip(boxed, xyxy.tolist()):
+                d["xyxy"] = box
         # filter by conf if possible
         dets_filtered = []
         for d in dets:
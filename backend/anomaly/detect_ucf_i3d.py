@@ -143,26 +143,32 @@ def predict(file_path: str) -> Dict[str, Any]:
                     "model_path": _model_path,
                     "note": "no-frames-extracted"
                 }
-            # Convert frames (BGR -> RGB)
             import torch
-            frames_rgb = [np.ascontiguousarray(f[..., ::-1]) for f in frames]
-            arr = np.stack(frames_rgb, axis=0)  # T,H,W,3
-            arr = arr.transpose(3, 0, 1, 2)     # C,T,H,W
-            tensor = torch.from_numpy(arr).unsqueeze(0).float() / 255.0  # 1,C,T,H,W
-            # run no_grad
-            model.eval()
-            with torch.no_grad():
-                out = model(tensor) if callable(model) else None
-            # Interpret output
-            # Replace following with your model's actual output handling
+            from .preprocess import pool, clip_into
+            h, w = frames[0].shape[:2]
+            if any(f.shape[:2] != (h, w) for f in frames):
+                import cv2
+                frames = [f if f.shape[:2] == (h, w) else cv2.resize(f, (w, h)) for f in frames]
+            # BGR -> RGB, /255 and T,H,W,C -> 1,C,T,H,W in one pass into a pooled buffer;
+            # torch.from_numpy shares its memory, so the model reads it without a copy
+            with pool.borrow((1, 3, len(frames), h, w), np.float32) as clip:
+                clip_into(frames, clip)
+                tensor = torch.from_numpy(clip)
+                # run no_grad
+                model.eval()
+                with torch.no_grad():
+                    out = model(tensor) if callable(model) else None
+                # Interpret output
+                # Replace following with your model's actual output handling
+                if out is not None:
+                    # if out is tensor or numpy; copied out before the buffer is reused
+                    if isinstance(out, torch.Tensor):
+                        outv = out.detach().cpu().numpy().copy()
+                    else:
+                        outv = np.array(out)
             if out is None:
                 score = 0.4
             else:
-                # if out is tensor or numpy
-                if isinstance(out, torch.Tensor):
-                    outv = out.detach().cpu().numpy()
-                else:
-                    outv = np.array(out)
                 # simple aggregate
                 score = float(np.mean(outv).item() if outv.size else 0.0)
                 # normalize heuristically
@@ -6,10 +6,14 @@ If ultralytics is not installed or model not present, returns a stub response.
 """
 import os
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+import numpy as np
 
 log = logging.getLogger(__name__)
 
+# Images per forward pass in predict_images(); bounded by GPU/CPU memory
+BATCH_SIZE = int(os.environ.get("YOLO_BATCH_SIZE", 16))
+
 DEFAULT_MODEL_PATHS = [
     os.path.join(os.path.dirname(__file__), "..", "python", "models", "best.pt"),
     os.path.join(os.path.dirname(__file__), "models", "best.pt"),
@@ -69,27 +73,7 @@ def predict(file_path: str, conf: float = 0.25, save_txt: bool = False) -> Dict[
     try:
         results = model.predict(source=file_path, conf=conf, save=False, verbose=False)
         # results is a list (one per source). We'll only use the first
-        out = []
-        if results:
-            r = results[0]
-            # r.boxes, r.boxes.xyxy, r.boxes.conf, r.boxes.cls, r.names
-            boxes = getattr(r, "boxes", None)
-            if boxes is not None:
-                for box in boxes:
-                    try:
-                        xyxy = box.xyxy.tolist()[0] if hasattr(box.xyxy, "tolist") else list(box.xyxy)
-                        confv = float(box.conf[0]) if hasattr(box.conf, "__len__") else float(box.conf)
-                        cls = int(box.cls[0]) if hasattr(box.cls, "__len__") else int(box.cls)
-                        label = r.names.get(cls, str(cls)) if hasattr(r, "names") else str(cls)
-                        out.append({
-                            "xyxy": xyxy,
-                            "confidence": confv,
-                            "class": cls,
-                            "label": label
-                        })
-                    except Exception:
-                        # best-effort parse
-                        pass
+        out = results_to_detections(results[:1])[0] if results else []
         return {
             "model_loaded": True,
             "model_path": _model_path,
@@ -103,3 +87,94 @@ def predict(file_path: str, conf: float = 0.25, save_txt: bool = False) -> Dict[
             "detections": [],
             "error": str(e)
         }
+
+def results_to_detections(results) -> List[List[Dict[str, Any]]]:
+    """
+    Convert a batch of ultralytics Results to per-image detection lists.
+
+    Each r.boxes.data is an [N, 6] tensor of x1, y1, x2, y2, conf, cls. They are
+    concatenated and moved to the host once per batch and converted with a single
+    tolist(), instead of a device sync and float()/int() call per box.
+    """
+    tensors = []
+    counts = []
+    for r in results:
+        boxes = getattr(r, "boxes", None)
+        data = getattr(boxes, "data", None) if boxes is not None else None
+        counts.append(0 if data is None else len(data))
+        if data is not None and len(data):
+            tensors.append(data)
+    if tensors:
+        if hasattr(tensors[0], "cpu"):
+            import torch
+            rows = torch.cat(tensors).float().cpu().numpy()
+        else:
+            rows = np.concatenate([np.asarray(t, dtype=np.float32) for t in tensors])
+        boxes_list = rows[:, :4].tolist()
+        conf_list = rows[:, 4].tolist()
+        cls_list = rows[:, 5].astype(np.int64).tolist()
+    names = (getattr(results[0], "names", None) or {}) if results else {}
+
+    out = []
+    start = 0
+    for n in counts:
+        out.append([
+            {"xyxy": boxes_list[i], "confidence": conf_list[i], "class": cls_list[i],
+             "label": names.get(cls_list[i], str(cls_list[i]))}
+            for i in range(start, start + n)
+        ])
+        start += n
+    return out
+
+def predict_images(images: List["np.ndarray"], conf: float = 0.25, batch_size: int = BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Run YOLO on many decoded BGR images, batch_size images per forward pass.
+    Returns {"model_loaded", "model_path", "detections": [per-image list, ...],
+    "errors": [per-image None or message, ...]}. A chunk that fails is retried
+    image by image, so one bad image only fails itself.
+    """
+    model = load_model()
+    if model is None:
+        return {
+            "model_loaded": False,
+            "model_path": _model_path,
+            "detections": [[] for _ in images],
+            "errors": [None for _ in images],
+            "note": "YOLO model not available — returned stub"
+        }
+
+    def run(chunk):
+        # A list source is letterboxed and stacked into one [B, 3, H, W] tensor
+        results = model.predict(source=chunk, conf=conf, save=False, verbose=False, batch=len(chunk))
+        return results_to_detections(results)
+
+    detections: List[List[Dict[str, Any]]] = []
+    errors: List[Optional[str]] = []
+    for start in range(0, len(images), batch_size):
+        chunk = images[start:start + batch_size]
+        try:
+            detections.extend(run(chunk))
+            errors.extend([None] * len(chunk))
+            continue
+        except Exception as e:
+            if len(chunk) == 1:
+                log.exception("YOLO failed on image %d", start)
+                detections.append([])
+                errors.append(str(e))
+                continue
+            log.warning("YOLO batch of images %d-%d failed (%s); retrying one by one",
+                        start, start + len(chunk) - 1, e)
+        for offset, image in enumerate(chunk):
+            try:
+                detections.extend(run([image]))
+                errors.append(None)
+            except Exception as e:
+                log.exception("YOLO failed on image %d", start + offset)
+                detections.append([])
+                errors.append(str(e))
+    return {
+        "model_loaded": True,
+        "model_path": _model_path,
+        "detections": detections,
+        "errors": errors,
+    }
@@ -0,0 +1,304 @@
+# governor.py
+"""
+Core-aware thread budgets for torch, ONNX Runtime and OpenCV.
+
+By default each framework sizes its thread pool to every core on the host, so
+one worker running torch, ORT and cv2 work at once (and several such workers)
+oversubscribes the CPU and latency climbs with load. The governor works out
+the CPUs this process may really use (affinity mask and cgroup CPU quota),
+divides them between the service's workers, and splits each worker's share
+between the frameworks its enabled detectors use:
+
+  ucf, shoplifting -> torch (intra-op threads, inter-op 1)
+  weapon           -> ONNX Runtime (intra_op_num_threads, inter-op 1)
+  decode/resize    -> OpenCV (a small fixed share)
+
+apply() sets OMP/MKL/OpenBLAS and OpenCV thread environment variables (read
+when those libraries load) and configures torch/cv2 if already imported; the
+plugin loader re-applies it after each detector import, and detect_onnx builds
+its session with ort_session_options().
+
+Environment:
+  GOVERNOR=0                 disable (frameworks keep their defaults)
+  GOVERNOR_WORKERS           workers sharing the CPUs (default SERVE_WORKERS / WEB_CONCURRENCY / 1)
+  GOVERNOR_CPUS              override the detected CPU count
+  GOVERNOR_TORCH_THREADS, GOVERNOR_ORT_THREADS, GOVERNOR_CV2_THREADS   explicit budgets
+  GOVERNOR_PIN=1             pin each worker to its own slice of CPUs (GOVERNOR_WORKER_SLOT, set by
+                             serve.py under gunicorn; without a slot the worker is not pinned)
+
+Benchmark throughput under concurrency with and without the governor:
+  python -m anomaly.governor --bench --workers 4 --threads 4
+"""
+import os
+import sys
+import math
+import time
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+log = logging.getLogger(__name__)
+
+# Framework each detector plugin runs on
+DETECTOR_FRAMEWORKS = {"ucf": "torch", "shoplifting": "torch", "weapon": "ort"}
+
+_budget: Optional[Dict[str, Any]] = None
+_torch_configured = False
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value and value.strip().isdigit() else None
+
+
+def enabled() -> bool:
+    return os.environ.get("GOVERNOR", "1") != "0"
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """CPU quota from cgroup v2 cpu.max or v1 cfs_quota/period, or None when unlimited"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as fh:
+            quota, period = fh.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as fh:
+            quota = int(fh.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as fh:
+            period = int(fh.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def affinity_cpus() -> List[int]:
+    """CPU ids this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def available_cpus() -> int:
+    """Usable CPUs: the affinity mask, capped by the cgroup quota (rounded up)"""
+    override = _env_int("GOVERNOR_CPUS")
+    if override:
+        return override
+    cpus = len(affinity_cpus())
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return max(1, cpus)
+
+
+def worker_count() -> int:
+    for name in ("GOVERNOR_WORKERS", "SERVE_WORKERS", "WEB_CONCURRENCY"):
+        value = _env_int(name)
+        if value:
+            return value
+    return 1
+
+
+def plan(detectors: Iterable[str], cpus: Optional[int] = None, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Thread budget per framework for one worker hosting the given detectors"""
+    cpus = cpus or available_cpus()
+    workers = workers or worker_count()
+    share = max(1, cpus // workers)
+    frameworks = [DETECTOR_FRAMEWORKS[d] for d in detectors if d in DETECTOR_FRAMEWORKS]
+    # OpenCV only decodes/resizes here; a quarter of the share, at most 2
+    cv2_threads = max(1, min(2, share // 4))
+    compute = max(1, share - cv2_threads) if share > 2 else share
+    n_torch, n_ort = frameworks.count("torch"), frameworks.count("ort")
+    if n_torch and n_ort:
+        torch_threads = max(1, round(compute * n_torch / (n_torch + n_ort)))
+        ort_threads = max(1, compute - torch_threads)
+    else:
+        torch_threads = ort_threads = compute
+    return {
+        "cpus": cpus,
+        "workers": workers,
+        "share": share,
+        "torch": _env_int("GOVERNOR_TORCH_THREADS") or torch_threads,
+        "ort": _env_int("GOVERNOR_ORT_THREADS") or ort_threads,
+        "cv2": _env_int("GOVERNOR_CV2_THREADS") or cv2_threads,
+        "pinned": None,
+    }
+
+
+def _pin(budget: Dict[str, Any]) -> None:
+    """Restrict this worker to its slot's slice of the affinity mask"""
+    if not hasattr(os, "sched_setaffinity"):
+        log.warning("GOVERNOR_PIN is set but CPU affinity is not supported on this platform")
+        return
+    cpus = affinity_cpus()
+    workers = budget["workers"]
+    if workers > len(cpus):
+        return
+    slot = _env_int("GOVERNOR_WORKER_SLOT")
+    if slot is None:
+        if workers > 1:
+            # Guessing (e.g. from the pid) could put two workers on the same CPUs
+            log.warning("GOVERNOR_PIN is set but no GOVERNOR_WORKER_SLOT was assigned; not pinning")
+            return
+        slot = 0
+    slot %= workers
+    per = len(cpus) // workers
+    mine = cpus[slot * per:(slot + 1) * per]
+    # Threads created after this inherit the mask, so pin before any pool starts
+    os.sched_setaffinity(0, mine)
+    budget["pinned"] = mine
+
+
+def apply(detectors: Iterable[str], workers: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Compute and install this process's thread budget; call before detectors load"""
+    global _budget
+    if not enabled():
+        return None
+    budget = plan(list(detectors), workers=workers)
+    if os.environ.get("GOVERNOR_PIN") == "1":
+        _pin(budget)
+    compute = max(budget["torch"], budget["ort"])
+    # Read by OpenMP/MKL/OpenBLAS/OpenCV when they initialise; explicit settings win
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ.setdefault(name, str(compute))
+    os.environ.setdefault("OPENCV_FOR_THREADS_NUM", str(budget["cv2"]))
+    _budget = budget
+    configure_loaded()
+    log.info("Thread budget for worker %s: %s", os.getpid(), budget)
+    return budget
+
+
+def budget() -> Optional[Dict[str, Any]]:
+    return _budget
+
+
+def configure_loaded() -> None:
+    """Apply the budget to whichever of torch/cv2 has been imported so far"""
+    if "torch" in sys.modules:
+        configure_torch()
+    if "cv2" in sys.modules:
+        configure_cv2()
+
+
+def configure_torch() -> None:
+    """Apply the torch budget; inter-op threads can only be set once per process"""
+    global _torch_configured
+    if _budget is None:
+        return
+    import torch
+    torch.set_num_threads(_budget["torch"])
+    if not _torch_configured:
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # already used; only intra-op can change now
+        _torch_configured = True
+
+
+def configure_cv2() -> None:
+    if _budget is None:
+        return
+    import cv2
+    cv2.setNumThreads(_budget["cv2"])
+
+
+def ort_session_options(ort):
+    """SessionOptions for detect_onnx.load_model with the ORT budget applied"""
+    opts = ort.SessionOptions()
+    if _budget is not None:
+        opts.intra_op_num_threads = _budget["ort"]
+        opts.inter_op_num_threads = 1
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        # Spinning idle threads burn cores other workers need
+        opts.add_session_config_entry("session.intra_op.allow_spinning", "0")
+    return opts
+
+
+# ---- benchmark --------------------------------------------------------------
+
+def _bench_worker(governed: bool, workers: int, threads: int, seconds: float, model: Optional[str], queue) -> None:
+    if not governed:
+        os.environ["GOVERNOR"] = "0"
+    apply(["weapon"] if model else ["ucf"], workers=workers)
+    import threading
+    import numpy as np
+    import cv2
+    if governed:
+        configure_cv2()
+    rng = np.random.default_rng(os.getpid())
+    frame = rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    if model:
+        import onnxruntime as ort
+        from .preprocess import OrtRunner
+        sess = ort.InferenceSession(model, sess_options=ort_session_options(ort) if governed else None,
+                                    providers=["CPUExecutionProvider"])
+        runner = OrtRunner(sess)
+        work = lambda: runner.run_image(frame)
+    else:
+        # Stand-in for model inference: a BLAS-threaded matmul plus cv2 preprocessing
+        a = rng.random((384, 384), dtype=np.float32)
+        def work():
+            small = cv2.resize(cv2.GaussianBlur(frame, (9, 9), 0), (640, 360))
+            return a @ a @ a, small
+
+    latencies: List[float] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            work()
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+
+    pool = [threading.Thread(target=client) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    queue.put(latencies)
+
+
+def bench(workers: int, threads: int, seconds: float, model: Optional[str]) -> None:
+    import multiprocessing
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{available_cpus()} CPUs, {workers} workers x {threads} concurrent requests, {seconds:.0f}s per run"
+          + (f", model {model}" if model else ", matmul+cv2 stand-in workload"))
+    for governed in (False, True):
+        queue = ctx.Queue()
+        procs = [ctx.Process(target=_bench_worker, args=(governed, workers, threads, seconds, model, queue))
+                 for _ in range(workers)]
+        for p in procs:
+            p.start()
+        latencies = sorted(l for _ in procs for l in queue.get())
+        for p in procs:
+            p.join()
+        n = len(latencies)
+        pick = lambda q: latencies[min(n - 1, int(q * n))] * 1000
+        print(f"  {'governed  ' if governed else 'ungoverned'}  {n / seconds:7.1f} req/s  "
+              f"p50 {pick(0.5):7.1f} ms  p95 {pick(0.95):7.1f} ms  p99 {pick(0.99):7.1f} ms")
+
+
+def main(argv=None) -> None:
+    import argparse
+    parser = argparse.ArgumentParser(description="Show the thread budget, or benchmark it under concurrency")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--workers", type=int, default=worker_count())
+    parser.add_argument("--threads", type=int, default=4, help="concurrent requests per worker")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--model", help="ONNX model to benchmark (default: stand-in workload)")
+    parser.add_argument("--detectors", default="ucf,shoplifting,weapon")
+    args = parser.parse_args(argv)
+    if args.bench:
+        bench(args.workers, args.threads, args.seconds, args.model)
+    else:
+        print(plan(args.detectors.split(","), workers=args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# plugins.py
+"""
+Detector plugins for the anomaly service.
+
+Each detector (I3D/UCF, YOLO shoplifting, ONNX weapon, ...) is a module exposing
+load_model() and predict(file_path, ...). Plugins are only registered by module
+path here; the module, and the torch/ultralytics/onnxruntime it pulls in, is
+imported the first time the detector is used, and only if it is enabled for
+this worker.
+
+ANOMALY_DETECTORS picks the detectors a worker hosts (comma-separated names,
+default: all). Extra detectors can be registered with register_detector() or
+through the "justicechain.detectors" entry point group (name = "pkg.module").
+Import and model-load time and resident-memory growth are recorded per plugin
+and reported by plugin_report() (GET /detectors).
+"""
+import os
+import time
+import logging
+import importlib
+import threading
+from typing import Any, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "justicechain.detectors"
+
+
+class DetectorDisabled(LookupError):
+    """The detector is unknown or not enabled in this worker"""
+
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size, or None where it can't be read cheaply"""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        import sys
+        # peak, not current, but still shows growth; bytes on macOS, KB elsewhere
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return None
+
+
+def _mb(delta: Optional[int]) -> Optional[float]:
+    return None if delta is None else round(delta / (1024 * 1024), 1)
+
+
+class DetectorPlugin:
+    """A detector module that is imported and loaded on first use"""
+
+    def __init__(self, name: str, module: str, description: str = "", takes_conf: bool = True):
+        self.name = name
+        self.module_name = module
+        self.description = description
+        # predict(file_path, conf=..., save_txt=...) vs predict(file_path)
+        self.takes_conf = takes_conf
+        self.module = None
+        self.loaded = False
+        self.import_ms: Optional[float] = None
+        self.import_rss_mb: Optional[float] = None
+        self.load_ms: Optional[float] = None
+        self.load_rss_mb: Optional[float] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def import_module(self):
+        if self.module is not None:
+            return self.module
+        with self._lock:
+            if self.module is None:
+                rss = _rss_bytes()
+                started = time.perf_counter()
+                try:
+                    module = importlib.import_module(self.module_name)
+                except Exception as e:
+                    self.error = f"import failed: {e}"
+                    raise
+                self.import_ms = round((time.perf_counter() - started) * 1000, 1)
+                # torch/cv2 may have just been imported: give them this worker's thread budget
+                from .governor import configure_loaded
+                configure_loaded()
+                after = _rss_bytes()
+                self.import_rss_mb = _mb(after - rss) if rss is not None and after is not None else None
+                log.info("Imported detector %s (%s) in %.0f ms, +%s MB RSS",
+                         self.name, self.module_name, self.import_ms, self.import_rss_mb)
+                self.module = module
+        return self.module
+
+    def load(self):
+        """Import the module and load its model weights"""
+        module = self.import_module()
+        if self.loaded:
+            return module
+        with self._lock:
+            if not self.loaded:
+                rss = _rss_bytes()
+                started = time.perf_counter()
+                model = module.load_model()
+                self.load_ms = round((time.perf_counter() - started) * 1000, 1)
+                after = _rss_bytes()
+                self.load_rss_mb = _mb(after - rss) if rss is not None and after is not None else None
+                self.loaded = True
+                if model is None:
+                    self.error = "model unavailable, running stub"
+                log.info("Loaded detector %s model in %.0f ms, +%s MB RSS",
+                         self.name, self.load_ms, self.load_rss_mb)
+        return module
+
+    def predict(self, file_path: str, conf: float = 0.25, save_txt: bool = False) -> Dict[str, Any]:
+        module = self.load()
+        if self.takes_conf:
+            return module.predict(file_path, conf=conf, save_txt=save_txt)
+        return module.predict(file_path)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "module": self.module_name,
+            "description": self.description,
+            "enabled": self.name in enabled_detectors(),
+            "imported": self.module is not None,
+            "loaded": self.loaded,
+            "import_ms": self.import_ms,
+            "import_rss_mb": self.import_rss_mb,
+            "load_ms": self.load_ms,
+            "load_rss_mb": self.load_rss_mb,
+            "error": self.error,
+        }
+
+
+PLUGINS: Dict[str, DetectorPlugin] = {}
+_entry_points_scanned = False
+
+
+def register_detector(name: str, module: str, description: str = "", takes_conf: bool = True) -> DetectorPlugin:
+    """Register a detector by module path; nothing is imported until it is used"""
+    plugin = DetectorPlugin(name, module, description, takes_conf)
+    PLUGINS[name] = plugin
+    return plugin
+
+
+register_detector("ucf", "anomaly.detect_ucf_i3d", "I3D/UCF video anomaly score (PyTorch)", takes_conf=False)
+register_detector("shoplifting", "anomaly.detect_yolo", "YOLO shoplifting detector (ultralytics)")
+register_detector("weapon", "anomaly.detect_onnx", "Weapon detector (ONNX Runtime)")
+
+
+def discover_plugins() -> Dict[str, DetectorPlugin]:
+    """Registered plugins, including installed entry points (read from metadata, not imported)"""
+    global _entry_points_scanned
+    if not _entry_points_scanned:
+        _entry_points_scanned = True
+        try:
+            from importlib.metadata import entry_points
+            eps = entry_points()
+            group = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, "select") else eps.get(ENTRY_POINT_GROUP, [])
+            for ep in group:
+                if ep.name not in PLUGINS:
+                    register_detector(ep.name, ep.value.split(":")[0], f"entry point {ep.value}")
+        except Exception as e:
+            log.warning("Detector entry point discovery failed: %s", e)
+    return PLUGINS
+
+
+def enabled_detectors() -> List[str]:
+    """Detectors this worker hosts, from ANOMALY_DETECTORS (default: all registered)"""
+    plugins = discover_plugins()
+    value = os.environ.get("ANOMALY_DETECTORS", "all").strip()
+    if value.lower() == "all":
+        return list(plugins)
+    names = [n.strip() for n in value.split(",") if n.strip() and n.strip().lower() != "none"]
+    unknown = [n for n in names if n not in plugins]
+    if unknown:
+        log.warning("ANOMALY_DETECTORS names unknown detectors: %s", ", ".join(unknown))
+    return [n for n in names if n in plugins]
+
+
+def get_detector(name: str) -> DetectorPlugin:
+    """The plugin for an enabled detector; raises DetectorDisabled otherwise"""
+    if name not in enabled_detectors():
+        raise DetectorDisabled(f"Detector '{name}' is not enabled on this worker")
+    return PLUGINS[name]
+
+
+def load_enabled() -> None:
+    """Import and load every enabled detector (for preloading before traffic)"""
+    for name in enabled_detectors():
+        try:
+            PLUGINS[name].load()
+        except Exception:
+            log.exception("Preloading detector %s failed", name)
+
+
+def plugin_report() -> Dict[str, Any]:
+    return {
+        "pid": os.getpid(),
+        "enabled": enabled_detectors(),
+        "rss_mb": _mb(_rss_bytes()),
+        "detectors": [p.report() for p in discover_plugins().values()],
+    }
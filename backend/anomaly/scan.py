@@ -0,0 +1,387 @@
+# scan.py
+"""
+Offline bulk scanner: run the anomaly detectors over every image/video under a
+directory (e.g. a seized drive of CCTV exports) without going through HTTP.
+
+Files are sharded across worker processes, each of which loads its detectors
+once. Every finished file is appended to a JSONL checkpoint in the output
+directory, so re-running the same command after an interruption skips what is
+already done; files that failed are scanned again unless --skip-failed is
+given. At the end the checkpoint is written out as a results table (CSV, or
+Parquet when pyarrow is installed) plus a summary report. The table has
+score/label columns for ucf and detection count/max confidence columns for
+every other detector, including ones registered through entry points.
+
+Run from backend:
+  python -m anomaly.scan /mnt/evidence/drive01 --out scans/drive01 --workers 4
+  python -m anomaly.scan /mnt/evidence/drive01 --out scans/drive01 --detectors ucf,weapon --format parquet
+"""
+import os
+import sys
+import csv
+import json
+import time
+import signal
+import logging
+import argparse
+import multiprocessing
+from typing import Any, Dict, Iterable, List, Optional
+
+from .plugins import discover_plugins
+from . import governor
+
+log = logging.getLogger("anomaly_scan")
+
+VIDEO_EXTS = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+CHECKPOINT_NAME = "checkpoint.jsonl"
+
+LEADING_COLUMNS = ["path", "size_bytes", "mtime", "media_type", "status", "error"]
+TRAILING_COLUMNS = ["total_ms", "worker_pid", "scanned_at"]
+
+
+def detector_columns(name: str) -> List[str]:
+    """Result columns scan_file fills in for one detector"""
+    if name == "ucf":
+        return ["ucf_score", "ucf_label", "ucf_ms"]
+    return [f"{name}_detections", f"{name}_max_conf", f"{name}_ms"]
+
+
+def table_columns(rows: List[Dict[str, Any]], detectors: List[str]) -> List[str]:
+    """
+    Columns for the results table: those of the selected detectors, then any
+    other detector columns found in the rows (e.g. from an earlier run with
+    different --detectors), so nothing in the checkpoint is dropped.
+    """
+    columns = LEADING_COLUMNS + [c for name in detectors for c in detector_columns(name)]
+    known = set(columns) | set(TRAILING_COLUMNS) | {"key"}
+    extra = []
+    for row in rows:
+        extra += [c for c in row if c not in known and c not in extra]
+    return columns + extra + TRAILING_COLUMNS
+
+
+def iter_media_files(root: str) -> Iterable[str]:
+    """Relative paths of all images/videos under root, in a stable order"""
+    exts = VIDEO_EXTS | IMAGE_EXTS
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.startswith("."):
+                continue
+            if os.path.splitext(name)[1].lower() in exts:
+                yield os.path.relpath(os.path.join(dirpath, name), root)
+
+
+def file_key(root: str, rel: str) -> Optional[str]:
+    """Checkpoint key: a file that changed since it was scanned is scanned again"""
+    try:
+        st = os.stat(os.path.join(root, rel))
+    except OSError:
+        return None
+    return f"{rel}|{st.st_size}|{int(st.st_mtime)}"
+
+
+def load_checkpoint(path: str) -> Dict[str, Dict[str, Any]]:
+    """Rows already written by earlier runs, keyed by file_key; a torn last line is ignored"""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb") as fh:
+        for line in fh:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            done[row["key"]] = row
+    return done
+
+
+# ---- worker side ------------------------------------------------------------
+
+_worker_detectors: Dict[str, Any] = {}
+_worker_conf = 0.25
+
+
+def _init_worker(detector_names: List[str], conf: float, workers: int):
+    """Pool initializer: import and load each detector once per process"""
+    global _worker_detectors, _worker_conf
+    # Ctrl-C is handled by the parent, which terminates the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+    _worker_conf = conf
+    governor.apply(detector_names, workers=workers)
+    plugins = discover_plugins()
+    for name in detector_names:
+        plugins[name].load()
+        _worker_detectors[name] = plugins[name]
+
+
+def _summarize_detections(result: Dict[str, Any]):
+    dets = [d for d in result.get("detections") or [] if "confidence" in d]
+    return len(dets), max((float(d["confidence"]) for d in dets), default=None)
+
+
+def scan_file(root: str, rel: str, key: str) -> Dict[str, Any]:
+    """Run every loaded detector on one file and flatten the results into a row"""
+    path = os.path.join(root, rel)
+    started = time.perf_counter()
+    st = os.stat(path)
+    ext = os.path.splitext(rel)[1].lower()
+    row: Dict[str, Any] = {
+        "key": key,
+        "path": rel,
+        "size_bytes": st.st_size,
+        "mtime": int(st.st_mtime),
+        "media_type": "video" if ext in VIDEO_EXTS else "image",
+        "status": "ok",
+        "error": None,
+        "worker_pid": os.getpid(),
+    }
+    errors = []
+    for name, plugin in _worker_detectors.items():
+        t0 = time.perf_counter()
+        try:
+            result = plugin.predict(path, conf=_worker_conf)
+            if result.get("error"):
+                errors.append(f"{name}: {result['error']}")
+            if name == "ucf":
+                row["ucf_score"] = result.get("anomaly_score")
+                row["ucf_label"] = result.get("anomaly_label")
+            else:
+                row[f"{name}_detections"], row[f"{name}_max_conf"] = _summarize_detections(result)
+        except Exception as e:
+            log.exception("%s failed on %s", name, rel)
+            errors.append(f"{name}: {e}")
+        row[f"{name}_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    if errors:
+        row["status"] = "error"
+        row["error"] = "; ".join(errors)
+    row["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    row["scanned_at"] = time.time()
+    return row
+
+
+def _scan_task(task):
+    root, rel, key = task
+    try:
+        return scan_file(root, rel, key)
+    except Exception as e:
+        # unreadable/vanished file: record it so the run still completes
+        return {"key": key, "path": rel, "status": "error", "error": str(e),
+                "worker_pid": os.getpid(), "scanned_at": time.time()}
+
+
+# ---- parent side ------------------------------------------------------------
+
+def write_table(rows: List[Dict[str, Any]], path: str, fmt: str, detectors: List[str]) -> str:
+    """Write rows as CSV or Parquet; falls back to CSV when pyarrow is missing"""
+    columns = table_columns(rows, detectors)
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except Exception:
+            log.warning("pyarrow not installed; writing CSV instead of Parquet")
+            fmt = "csv"
+        else:
+            table = pa.Table.from_pylist([{c: r.get(c) for c in columns} for r in rows])
+            out = f"{path}.parquet"
+            pq.write_table(table, out)
+            return out
+    out = f"{path}.csv"
+    with open(out, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    return out
+
+
+def _percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {"mean": round(sum(values) / len(values), 1), "p50": pick(0.5), "p95": pick(0.95), "max": values[-1]}
+
+
+def build_report(rows: List[Dict[str, Any]], detectors: List[str], run: Dict[str, Any], top: int = 25) -> Dict[str, Any]:
+    ok = [r for r in rows if r.get("status") == "ok"]
+    report = {
+        "root": run["root"],
+        "detectors": detectors,
+        "files": len(rows),
+        "ok": len(ok),
+        "errors": len(rows) - len(ok),
+        "by_media_type": {},
+        "this_run": run,
+        "timings_ms": {name: _percentiles([r[f"{name}_ms"] for r in rows if r.get(f"{name}_ms") is not None])
+                       for name in detectors + ["total"]},
+    }
+    for r in rows:
+        mt = r.get("media_type") or "unknown"
+        report["by_media_type"][mt] = report["by_media_type"].get(mt, 0) + 1
+    if "ucf" in detectors:
+        suspicious = [r for r in rows if r.get("ucf_label") == "suspicious"]
+        report["ucf_suspicious"] = len(suspicious)
+        report["top_ucf"] = [{"path": r["path"], "score": r["ucf_score"]}
+                             for r in sorted(suspicious, key=lambda r: r["ucf_score"] or 0, reverse=True)[:top]]
+    for name in detectors:
+        if name != "ucf":
+            hits = [r for r in rows if r.get(f"{name}_detections")]
+            report[f"{name}_files_with_detections"] = len(hits)
+            report[f"top_{name}"] = [{"path": r["path"], "detections": r[f"{name}_detections"],
+                                      "max_conf": r[f"{name}_max_conf"]}
+                                     for r in sorted(hits, key=lambda r: r[f"{name}_max_conf"] or 0, reverse=True)[:top]]
+    report["failed_files"] = [{"path": r["path"], "error": r.get("error")} for r in rows if r.get("status") != "ok"][:top]
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    run = report["this_run"]
+    lines = [
+        f"Scan of {report['root']}",
+        f"  detectors: {', '.join(report['detectors'])}",
+        f"  files: {report['files']} ({report['ok']} ok, {report['errors']} errors) "
+        + ", ".join(f"{k}={v}" for k, v in sorted(report["by_media_type"].items())),
+        f"  this run: {run['scanned']} scanned, {run['skipped']} resumed from checkpoint, "
+        f"{run['elapsed_s']:.0f}s, {run['files_per_hour']:.0f} files/hour",
+    ]
+    for name, stats in report["timings_ms"].items():
+        if stats:
+            lines.append(f"  {name} ms: mean {stats['mean']} p50 {stats['p50']} p95 {stats['p95']} max {stats['max']}")
+    if "ucf_suspicious" in report:
+        lines.append(f"  UCF suspicious: {report['ucf_suspicious']}")
+        lines += [f"    {t['score']:.3f}  {t['path']}" for t in report["top_ucf"]]
+    for name in report["detectors"]:
+        if name != "ucf" and f"top_{name}" in report:
+            lines.append(f"  {name} detections in {report[f'{name}_files_with_detections']} files")
+            lines += [f"    {t['detections']:>3} (max {t['max_conf']:.2f})  {t['path']}" for t in report[f"top_{name}"]]
+    if report["failed_files"]:
+        lines.append("  failures:")
+        lines += [f"    {f['path']}: {f['error']}" for f in report["failed_files"]]
+    return "\n".join(lines) + "\n"
+
+
+def run_scan(root: str, out_dir: str, detectors: List[str], workers: int, conf: float = 0.25,
+             fmt: str = "csv", log_every: float = 30.0, limit: Optional[int] = None,
+             retry_failed: bool = True) -> Dict[str, Any]:
+    root = os.path.abspath(root)
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint_path = os.path.join(out_dir, CHECKPOINT_NAME)
+    done = load_checkpoint(checkpoint_path)
+    # Error rows are usually transient (unreadable mount, OOM); the retry's row supersedes them
+    finished = {k for k, row in done.items() if row.get("status") == "ok" or not retry_failed}
+
+    tasks = []
+    current = {}
+    for rel in iter_media_files(root):
+        key = file_key(root, rel)
+        if key is None:
+            continue
+        current[key] = rel
+        if key not in finished:
+            tasks.append((root, rel, key))
+    if limit is not None:
+        tasks = tasks[:limit]
+    skipped = sum(1 for k in current if k in finished)
+    log.info("%d media files under %s: %d already in checkpoint, %d to scan with %d workers",
+             len(current), root, skipped, len(tasks), workers)
+
+    started = time.perf_counter()
+    scanned = failed = 0
+    last_log = started
+    # spawn: each worker imports torch/onnxruntime itself instead of inheriting a forked copy
+    ctx = multiprocessing.get_context("spawn")
+    pool = ctx.Pool(workers, initializer=_init_worker, initargs=(detectors, conf, workers))
+    interrupted = False
+    try:
+        with open(checkpoint_path, "a", encoding="utf-8") as ckpt:
+            # chunksize 1: video scan times vary too much for static sharding
+            for row in pool.imap_unordered(_scan_task, tasks, chunksize=1):
+                ckpt.write(json.dumps(row, ensure_ascii=False) + "\n")
+                ckpt.flush()
+                done[row["key"]] = row
+                scanned += 1
+                failed += row.get("status") != "ok"
+                log.debug("%s %s %.0fms", row["status"], row["path"], row.get("total_ms") or 0)
+                now = time.perf_counter()
+                if now - last_log >= log_every or scanned == len(tasks):
+                    rate = scanned / (now - started) * 3600
+                    eta = (len(tasks) - scanned) / rate * 3600 if rate else 0
+                    log.info("%d/%d files (%d errors), %.0f files/hour, ETA %.0fs",
+                             scanned, len(tasks), failed, rate, eta)
+                    last_log = now
+                    os.fsync(ckpt.fileno())
+        pool.close()
+    except KeyboardInterrupt:
+        interrupted = True
+        log.warning("Interrupted after %d files; re-run the same command to resume", scanned)
+        pool.terminate()
+    finally:
+        pool.join()
+
+    elapsed = time.perf_counter() - started
+    rows = [done[k] for k in current if k in done]
+    rows.sort(key=lambda r: r["path"])
+    run = {
+        "root": root,
+        "scanned": scanned,
+        "skipped": skipped,
+        "failed": failed,
+        "interrupted": interrupted,
+        "workers": workers,
+        "elapsed_s": round(elapsed, 1),
+        "files_per_hour": round(scanned / elapsed * 3600, 1) if elapsed > 0 else 0.0,
+    }
+    table_path = write_table(rows, os.path.join(out_dir, "results"), fmt, detectors)
+    report = build_report(rows, detectors, run)
+    with open(os.path.join(out_dir, "report.json"), "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    with open(os.path.join(out_dir, "report.txt"), "w", encoding="utf-8") as fh:
+        fh.write(format_report(report))
+    log.info("Wrote %s and report to %s", table_path, out_dir)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk anomaly scan of a directory of images/videos")
+    parser.add_argument("root", help="directory to scan (recursively)")
+    parser.add_argument("--out", help="output directory for checkpoint, results and report "
+                                      "(default: anomaly/outputs/scan_<dirname>)")
+    parser.add_argument("--detectors", default=",".join(discover_plugins()),
+                        help=f"comma-separated subset of {','.join(discover_plugins())} (default: all)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="worker processes, each holding its own models (default: half the cores)")
+    parser.add_argument("--conf", type=float, default=0.25, help="detection confidence threshold")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--log-every", type=float, default=30.0, help="seconds between progress lines")
+    parser.add_argument("--limit", type=int, help="scan at most this many new files")
+    parser.add_argument("--skip-failed", action="store_true",
+                        help="on resume, keep files that errored in an earlier run as failed "
+                             "instead of scanning them again (default: retry them)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+    detectors = [d.strip() for d in args.detectors.split(",") if d.strip()]
+    unknown = [d for d in detectors if d not in discover_plugins()]
+    if unknown or not detectors:
+        parser.error(f"unknown detectors: {', '.join(unknown)}" if unknown else "no detectors selected")
+    if not os.path.isdir(args.root):
+        parser.error(f"not a directory: {args.root}")
+    out_dir = args.out or os.path.join(os.path.dirname(__file__), "outputs",
+                                       "scan_" + os.path.basename(os.path.abspath(args.root)))
+
+    report = run_scan(args.root, out_dir, detectors, args.workers, conf=args.conf, fmt=args.format,
+                      log_every=args.log_every, limit=args.limit, retry_failed=not args.skip_failed)
+    sys.stdout.write(format_report(report))
+    return 130 if report["this_run"]["interrupted"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
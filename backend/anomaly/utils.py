@@ -3,23 +3,24 @@ import os
 import uuid
 import shutil
 import logging
-from typing import Tuple, List
-import cv2
-import numpy as np
+from typing import TYPE_CHECKING, Tuple, List, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
 
 log = logging.getLogger(__name__)
 
 BASE_DIR = os.path.dirname(__file__)
 TMP_DIR = os.path.join(BASE_DIR, "tmp")
 OUT_DIR = os.path.join(BASE_DIR, "outputs")
-os.makedirs(TMP_DIR, exist_ok=True)
-os.makedirs(OUT_DIR, exist_ok=True)
+# Directories are created on first use, so importing this module has no side effects
 
 def save_upload_file(upload_file) -> str:
     """
     Save FastAPI UploadFile to TMP_DIR and return absolute path.
     """
     fname = f"{uuid.uuid4().hex}_{os.path.basename(upload_file.filename)}"
+    os.makedirs(TMP_DIR, exist_ok=True)
     dest = os.path.join(TMP_DIR, fname)
     with open(dest, "wb") as buffer:
         shutil.copyfileobj(upload_file.file, buffer)
@@ -41,11 +42,33 @@ def is_video_file(path: str) -> bool:
     ext = os.path.splitext(path)[1].lower()
     return ext in [".mp4", ".avi", ".mov", ".mkv", ".webm"]
 
-def sample_frames(video_path: str, num_frames: int = 8, max_width: int = 320) -> List[np.ndarray]:
+def decode_images(payloads: List[bytes], max_workers: int = 4) -> List[Optional["np.ndarray"]]:
+    """
+    Decode encoded image bytes (jpg/png/...) to BGR arrays without touching disk.
+    cv2.imdecode releases the GIL, so decoding runs on a few threads; None marks
+    a payload that isn't a readable image.
+    """
+    import cv2
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+
+    def decode(data: bytes):
+        if not data:
+            return None
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    if len(payloads) <= 1:
+        return [decode(p) for p in payloads]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(payloads))) as pool:
+        return list(pool.map(decode, payloads))
+
+def sample_frames(video_path: str, num_frames: int = 8, max_width: int = 320) -> List["np.ndarray"]:
     """
     Sample `num_frames` frames evenly spaced across the video.
     Returns list of BGR numpy arrays (resized to max_width maintaining aspect).
     """
+    import cv2
+    import numpy as np
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         raise RuntimeError(f"Cannot open video {video_path}")
@@ -2,6 +2,8 @@ from flask import Flask
 from flask_cors import CORS
 from routes.summarizer_routes import summarizer_bp
 from routes.nlp_routes import nlp_bp
+from routes.search_routes import search_bp
+from utils.upload_handler import configure_uploads
 from dotenv import load_dotenv
 import os
 
@@ -13,10 +15,17 @@ openai_api_key = os.getenv("OPENAI_API_KEY")
 if not openai_api_key:
     print("Warning: OPENAI_API_KEY not found in environment variables!")
 
-app = Flask(__name__)
-CORS(app)
-app.register_blueprint(summarizer_bp)
-app.register_blueprint(nlp_bp)
+def create_app():
+    app = Flask(__name__)
+    CORS(app)
+    configure_uploads(app)
+    app.register_blueprint(summarizer_bp)
+    app.register_blueprint(nlp_bp)
+    app.register_blueprint(search_bp)
+    return app
+
+app = create_app()
 
 if __name__ == "__main__":
-    app.run(debug=True, port=8000)
\ No newline at end of file
+    # Development server only; see backend/serve.py for production serving
+    app.run(debug=os.getenv("FLASK_DEBUG", "1") == "1", port=int(os.getenv("FLASK_PORT", 8000)))
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import uuid
+import base64
+import threading
+import numpy as np
+from models.file_lock import FileLock
+from models.minhash import MinHasher, MinHashLSH
+
+DEFAULT_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'near_duplicates.jsonl')
+
+
+class DuplicateIndex:
+    """
+    Remembers the summary of every document and finds near-duplicates of new ones.
+
+    Documents are MinHashed over word 5-gram shingles and kept in an LSH index.
+    Each entry is also appended to a JSONL store, which is replayed on start
+    and tailed on lookup, so the index survives restarts and is shared by all
+    worker processes using the same file. Once the store holds a quarter more
+    than max_entries lines it is rewritten with only the newest max_entries;
+    other processes notice the new file and reload it.
+    """
+
+    def __init__(self, path, threshold=0.85, num_perm=128, bands=32, ngram=5, max_entries=50000):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._hasher = MinHasher(num_perm=num_perm, ngram=ngram, unit="word")
+        self._num_perm = num_perm
+        self._bands = bands
+        self._lsh = MinHashLSH(num_perm=num_perm, bands=bands)
+        self._entries = {}
+        self._offset = 0
+        self._inode = None
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            # Serialises appends with compaction across worker processes
+            self._write_lock = FileLock(path + '.lock')
+            self._refresh()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def signature(self, text):
+        return self._hasher.signature(text)
+
+    def _refresh(self):
+        """Load entries appended (by any process) since the last read"""
+        if not self.path:
+            return
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                return
+            if st.st_ino != self._inode or st.st_size < self._offset:
+                # First read, or another process compacted the store: start over
+                self._entries = {}
+                self._lsh = MinHashLSH(num_perm=self._num_perm, bands=self._bands)
+                self._offset = 0
+                self._inode = st.st_ino
+            if st.st_size == self._offset:
+                return
+            with open(self.path, 'rb') as fh:
+                fh.seek(self._offset)
+                for line in fh:
+                    if not line.endswith(b'\n'):
+                        break  # another process is mid-append; pick it up next time
+                    self._offset += len(line)
+                    entry = json.loads(line)
+                    sig = np.frombuffer(base64.b64decode(entry.pop("sig")), dtype=np.uint64)
+                    self._remember(entry, sig)
+
+    def _remember(self, entry, sig):
+        key = entry["key"]
+        if key in self._entries:
+            return
+        self._entries[key] = entry
+        self._lsh.add(key, sig)
+
+    def lookup(self, sig, mode=None):
+        """Most similar stored entry at or above the threshold (optionally same mode), or None"""
+        self._refresh()
+        for key, similarity in self._lsh.query(sig, self.threshold):
+            entry = self._entries[key]
+            if mode is None or entry["result"].get("mode") == mode:
+                return {**entry, "similarity": round(similarity, 3)}
+        return None
+
+    def add(self, sig, result, filename=None):
+        """Remember a document's summary result under its signature"""
+        entry = {
+            # Opaque: returned to other uploaders in place of the original filename
+            "key": uuid.uuid4().hex,
+            "filename": filename,
+            "added": time.time(),
+            "result": result,
+        }
+        if self.path:
+            line = json.dumps({**entry, "sig": base64.b64encode(sig.tobytes()).decode('ascii')},
+                              ensure_ascii=False) + '\n'
+            with self._write_lock:
+                # One O_APPEND write per entry keeps lines whole when workers append concurrently
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line.encode('utf-8'))
+                finally:
+                    os.close(fd)
+                # Our own line is picked up by the tail read along with anyone else's
+                self._refresh()
+                if len(self._entries) > self.max_entries * 5 // 4:
+                    self._compact()
+                    self._refresh()
+        else:
+            with self._lock:
+                self._remember(entry, sig)
+        return entry["key"]
+
+    def _compact(self):
+        """Rewrite the store with its newest max_entries lines; caller holds the write lock"""
+        with open(self.path, 'rb') as fh:
+            lines = [line for line in fh if line.endswith(b'\n')]
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as fh:
+            fh.writelines(lines[-self.max_entries:])
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.path)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_duplicate_index():
+    """Open the shared near-duplicate index (NEAR_DUPLICATE_STORE) on first use"""
+    global _index
+    if _index is None:
+        # Batch summaries call this from several pool threads at once
+        with _index_lock:
+            if _index is None:
+                _index = DuplicateIndex(
+                    os.getenv('NEAR_DUPLICATE_STORE') or DEFAULT_STORE_PATH,
+                    threshold=float(os.getenv('NEAR_DUPLICATE_THRESHOLD', '0.85')),
+                    max_entries=int(os.getenv('NEAR_DUPLICATE_MAX_ENTRIES', '50000')),
+                )
+    return _index
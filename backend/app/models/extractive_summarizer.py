@@ -0,0 +1,160 @@
+import re
+import numpy as np
+from scipy import sparse
+
+# Words that end with a period without ending the sentence in Indian legal text
+ABBREVIATIONS = {
+    "no", "nos", "v", "vs", "sec", "secs", "s", "ss", "art", "arts", "cl", "para", "paras",
+    "mr", "mrs", "ms", "dr", "smt", "sh", "shri", "hon", "ld", "ltd", "pvt", "co", "inc",
+    "j", "jj", "cj", "r", "o", "viz", "etc", "ie", "eg", "cr", "crl", "ipc", "crpc", "st",
+}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "been", "but", "by", "for", "from", "had", "has",
+    "have", "he", "her", "his", "in", "is", "it", "its", "of", "on", "or", "she", "that", "the",
+    "their", "there", "they", "this", "to", "was", "were", "which", "with", "would", "shall",
+    "said", "also", "any", "not", "such", "these", "those", "who", "whom", "upon", "into",
+}
+
+_BOUNDARY_RE = re.compile(r'(?<=[.!?;])["\')\]]*\s+(?=["\'(\[]?[A-Z0-9])')
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_LAST_WORD_RE = re.compile(r"([A-Za-z]+)\.[\"')\]]*$")
+
+
+def estimate_tokens(text):
+    """Rough OpenAI token count (about four characters per token for English)"""
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
+
+
+def split_sentences(text):
+    """Split text into sentences, keeping abbreviations such as 'Sec.' and 'v.' intact"""
+    text = re.sub(r'\s+', ' ', text or '').strip()
+    if not text:
+        return []
+
+    sentences = []
+    start = 0
+    for match in _BOUNDARY_RE.finditer(text):
+        candidate = text[start:match.start()]
+        last = _LAST_WORD_RE.search(candidate)
+        if last and (last.group(1).lower() in ABBREVIATIONS or len(last.group(1)) == 1):
+            continue
+        sentences.append(candidate.strip())
+        start = match.end()
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return [s for s in sentences if s]
+
+
+def tfidf_matrix(sentences):
+    """Return an L2-normalised sparse sentence x term TF-IDF matrix (sublinear tf)"""
+    vocab = {}
+    rows, cols, counts = [], [], []
+    for i, sentence in enumerate(sentences):
+        tf = {}
+        for word in _WORD_RE.findall(sentence.lower()):
+            if len(word) < 2 or word in STOPWORDS:
+                continue
+            j = vocab.setdefault(word, len(vocab))
+            tf[j] = tf.get(j, 0) + 1
+        for j, c in tf.items():
+            rows.append(i)
+            cols.append(j)
+            counts.append(c)
+
+    n = len(sentences)
+    if not vocab:
+        return sparse.csr_matrix((n, 0), dtype=np.float32)
+
+    cols = np.asarray(cols, dtype=np.int32)
+    data = 1.0 + np.log(np.asarray(counts, dtype=np.float32))
+    df = np.bincount(cols, minlength=len(vocab))
+    idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+    data *= idf[cols]
+
+    matrix = sparse.csr_matrix((data, (rows, cols)), shape=(n, len(vocab)), dtype=np.float32)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms).dot(matrix).tocsr()
+
+
+def textrank_scores(matrix, damping=0.85, max_iter=100, tol=1e-6, min_similarity=0.1):
+    """PageRank over the cosine-similarity graph of the sentence vectors"""
+    n = matrix.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    similarity = matrix.dot(matrix.T).tocsr()
+    similarity.setdiag(0)
+    # Weak edges barely move the ranking but dominate the cost of each iteration
+    similarity.data[similarity.data < min_similarity] = 0
+    similarity.eliminate_zeros()
+
+    out_weight = np.asarray(similarity.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    out_weight[dangling] = 1.0
+    transition = sparse.diags(1.0 / out_weight).dot(similarity).T.tocsr()
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        # Sentences with no similar neighbours spread their rank uniformly
+        leaked = scores[dangling].sum() / n
+        updated = (1.0 - damping) / n + damping * (transition.dot(scores) + leaked)
+        if np.abs(updated - scores).sum() < tol:
+            scores = updated
+            break
+        scores = updated
+    return scores
+
+
+def select_sentences(text, token_budget, diversity=0.3, max_similarity=0.8):
+    """
+    Pick high-ranked, non-redundant sentences that fit in token_budget, in document order.
+
+    Selection is greedy maximal marginal relevance: each step takes the sentence
+    maximising (1 - diversity) * rank - diversity * (its highest cosine similarity
+    to a sentence already chosen), and near-duplicates of a chosen sentence
+    (similarity >= max_similarity) are never taken, so repeated boilerplate
+    cannot crowd out the rest of the document.
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        return []
+    matrix = tfidf_matrix(sentences)
+    scores = textrank_scores(matrix)
+    lengths = np.array([estimate_tokens(s) for s in sentences])
+    relevance = scores / scores.max()
+
+    chosen = []
+    used = 0
+    redundancy = np.zeros(len(sentences))
+    available = lengths <= token_budget
+    while available.any():
+        gain = np.where(available, (1.0 - diversity) * relevance - diversity * redundancy, -np.inf)
+        i = int(np.argmax(gain))
+        chosen.append(i)
+        used += lengths[i]
+        similarity = matrix.dot(matrix[i].T).toarray().ravel()
+        redundancy = np.maximum(redundancy, similarity)
+        available &= (lengths <= token_budget - used) & (redundancy < max_similarity)
+        available[i] = False
+    if not chosen:
+        # Budget is smaller than any single sentence; keep the best one truncated
+        best = int(np.argmax(scores))
+        return [sentences[best][:token_budget * 4]]
+    return [sentences[i] for i in sorted(chosen)]
+
+
+def reduce_text(text, token_budget):
+    """Shrink text to its most salient sentences if it exceeds token_budget"""
+    if estimate_tokens(text) <= token_budget:
+        return text
+    return ' '.join(select_sentences(text, token_budget))
+
+
+def extractive_summary(text, max_len=150):
+    """Offline summary of roughly max_len words built only from the document's own sentences"""
+    # ~0.75 words per token, so max_len words is about max_len * 4/3 tokens
+    return ' '.join(select_sentences(text, max(1, max_len * 4 // 3)))
@@ -0,0 +1,104 @@
+import re
+import zlib
+import numpy as np
+
+# Universal hashing h(x) = (a*x + b) mod p with p = 2^31 - 1 keeps a*x inside uint64
+_PRIME = np.uint64((1 << 31) - 1)
+_MASK = 0x7FFFFFFF
+
+
+def normalize_text(text):
+    """Casefold and collapse whitespace so trivial formatting differences don't matter"""
+    return re.sub(r'\s+', ' ', text or '').strip().casefold()
+
+
+class MinHasher:
+    """MinHash signatures over character (unit="char") or word (unit="word") n-gram shingles"""
+
+    def __init__(self, num_perm=64, ngram=4, seed=1, unit="char"):
+        if unit not in ("char", "word"):
+            raise ValueError("unit must be 'char' or 'word'")
+        self.num_perm = num_perm
+        self.ngram = ngram
+        self.unit = unit
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MASK, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _MASK, size=num_perm).astype(np.uint64)
+
+    def shingles(self, text):
+        """Unique 31-bit hashes of the n-grams of the normalized text"""
+        text = normalize_text(text)
+        n = self.ngram
+        if self.unit == "word":
+            # Punctuation is dropped so rescans and re-typed copies still line up
+            words = re.findall(r'\w+', text)
+            grams = {' '.join(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+        else:
+            grams = {text[i:i + n] for i in range(max(1, len(text) - n + 1))}
+        return np.fromiter(
+            (zlib.crc32(g.encode('utf-8')) & _MASK for g in grams),
+            dtype=np.uint64,
+            count=len(grams),
+        )
+
+    def signature(self, text, chunk_size=4096):
+        """num_perm-long uint64 signature; chunked so large documents stay in bounded memory"""
+        hashes = self.shingles(text)
+        sig = np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        for start in range(0, len(hashes), chunk_size):
+            chunk = hashes[start:start + chunk_size]
+            values = (self._a[:, None] * chunk[None, :] + self._b[:, None]) % _PRIME
+            np.minimum(sig, values.min(axis=1), out=sig)
+        return sig
+
+
+def estimate_jaccard(sig_a, sig_b):
+    """Fraction of agreeing MinHash slots, an unbiased estimate of Jaccard similarity"""
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+class MinHashLSH:
+    """
+    Banded locality-sensitive hashing index over MinHash signatures.
+
+    Signatures are cut into `bands` bands; two items become candidates when any
+    band hashes identically, and candidates are then scored on the full signature.
+    """
+
+    def __init__(self, num_perm=64, bands=16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets = [dict() for _ in range(bands)]
+        self._signatures = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    def _band_keys(self, sig):
+        return [sig[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key, sig):
+        if key in self._signatures:
+            return
+        self._signatures[key] = sig
+        for bucket, band in zip(self._buckets, self._band_keys(sig)):
+            bucket.setdefault(band, []).append(key)
+
+    def query(self, sig, threshold=0.0):
+        """(key, estimated_jaccard) pairs at or above threshold, most similar first"""
+        candidates = set()
+        for bucket, band in zip(self._buckets, self._band_keys(sig)):
+            candidates.update(bucket.get(band, ()))
+        scored = []
+        for key in candidates:
+            similarity = estimate_jaccard(sig, self._signatures[key])
+            if similarity >= threshold:
+                scored.append((key, similarity))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored
@@ -0,0 +1,487 @@
+import os
+import re
+import json
+import html
+import time
+import zlib
+import heapq
+import shutil
+import logging
+import threading
+import numpy as np
+from models.extractive_summarizer import STOPWORDS
+from models.file_lock import FileLock
+
+log = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_PHRASE_RE = re.compile(r'"([^"]+)"')
+
+K1 = 1.2
+B = 0.75
+
+
+def analyze(text):
+    """Lower-cased alphanumeric tokens minus stopwords, as used at index and query time"""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+# --- Variable-byte coding (7 bits per byte, high bit marks the last byte of a value) ---
+
+def vbyte_encode(values):
+    values = np.asarray(values, dtype=np.uint64)
+    if values.size == 0:
+        return b''
+    nbytes = np.ones(values.shape, dtype=np.int64)
+    for shift in (7, 14, 21, 28, 35):
+        nbytes += values >= (np.uint64(1) << np.uint64(shift))
+    ends = np.cumsum(nbytes)
+    starts = ends - nbytes
+    # Position of each output byte within its value, least significant group first
+    owner = np.repeat(np.arange(values.size), nbytes)
+    position = np.arange(ends[-1]) - starts[owner]
+    out = ((values[owner] >> (np.uint64(7) * position.astype(np.uint64))) & np.uint64(0x7F)).astype(np.uint8)
+    out[ends - 1] |= 0x80
+    return out.tobytes()
+
+
+def vbyte_decode(buf):
+    data = np.frombuffer(buf, dtype=np.uint8)
+    if data.size == 0:
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(data & 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    group_start = np.repeat(starts, ends - starts + 1)
+    shift = (np.arange(data.size) - group_start).astype(np.uint64) * np.uint64(7)
+    parts = (data & 0x7F).astype(np.uint64) << shift
+    return np.add.reduceat(parts, starts)
+
+
+class Segment:
+    """
+    Immutable on-disk segment, memory-mapped on open.
+
+    Files: lexicon.bin (sorted UTF-8 terms) + lexicon.npy (term byte offsets),
+    postings.bin (per term, vbyte (doc-gap, tf) pairs) + postings.npy (offsets),
+    df.npy, doclens.npy, docids.npy (segment-local -> global id), and
+    docs.bin + docs.npy (zlib-compressed JSON per document, for snippets).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode='r')
+        self.term_offsets = load('lexicon.npy')
+        self.postings_offsets = load('postings.npy')
+        self.df = load('df.npy')
+        self.doclens = load('doclens.npy')
+        self.docids = load('docids.npy')
+        self.doc_offsets = load('docs.npy')
+        self._lexicon = self._map('lexicon.bin')
+        self._postings = self._map('postings.bin')
+        self._docs = self._map('docs.bin')
+
+    def _map(self, name):
+        full = os.path.join(self.path, name)
+        if os.path.getsize(full) == 0:
+            return b''
+        return np.memmap(full, dtype=np.uint8, mode='r')
+
+    @property
+    def doc_count(self):
+        return len(self.doclens)
+
+    @property
+    def num_terms(self):
+        return len(self.term_offsets) - 1
+
+    def term_at(self, i):
+        return bytes(self._lexicon[self.term_offsets[i]:self.term_offsets[i + 1]])
+
+    def find_term(self, term_bytes):
+        """Binary search the memory-mapped lexicon; returns the term index or -1"""
+        lo, hi = 0, self.num_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.term_at(mid) < term_bytes:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.num_terms and self.term_at(lo) == term_bytes:
+            return lo
+        return -1
+
+    def postings_at(self, i):
+        """(segment-local doc ids, term frequencies) of the i-th term"""
+        pairs = vbyte_decode(self._postings[self.postings_offsets[i]:self.postings_offsets[i + 1]])
+        pairs = pairs.reshape(-1, 2)
+        return np.cumsum(pairs[:, 0]).astype(np.int64), pairs[:, 1].astype(np.float32)
+
+    def postings(self, term):
+        i = self.find_term(term.encode('utf-8'))
+        if i < 0:
+            return None
+        return self.postings_at(i)
+
+    def document(self, local_id):
+        raw = bytes(self._docs[self.doc_offsets[local_id]:self.doc_offsets[local_id + 1]])
+        return json.loads(zlib.decompress(raw))
+
+
+def write_segment(path, term_postings, doclens, docids, docs):
+    """
+    Write a segment directory from already-sorted data.
+
+    term_postings yields (term_bytes, local_ids, tfs) in byte order of term;
+    docs yields the compressed payload of each document in local id order.
+    """
+    # A directory left by an interrupted write was never in the manifest, so replace it
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    term_offsets = [0]
+    postings_offsets = [0]
+    dfs = []
+    with open(os.path.join(path, 'lexicon.bin'), 'wb') as lex, \
+            open(os.path.join(path, 'postings.bin'), 'wb') as post:
+        for term, ids, tfs in term_postings:
+            gaps = np.diff(np.asarray(ids, dtype=np.int64), prepend=0)
+            pairs = np.empty(len(gaps) * 2, dtype=np.uint64)
+            pairs[0::2] = gaps
+            pairs[1::2] = tfs
+            encoded = vbyte_encode(pairs)
+            lex.write(term)
+            post.write(encoded)
+            term_offsets.append(term_offsets[-1] + len(term))
+            postings_offsets.append(postings_offsets[-1] + len(encoded))
+            dfs.append(len(ids))
+
+    doc_offsets = [0]
+    with open(os.path.join(path, 'docs.bin'), 'wb') as out:
+        for payload in docs:
+            out.write(payload)
+            doc_offsets.append(doc_offsets[-1] + len(payload))
+
+    np.save(os.path.join(path, 'lexicon.npy'), np.asarray(term_offsets, dtype=np.uint64))
+    np.save(os.path.join(path, 'postings.npy'), np.asarray(postings_offsets, dtype=np.uint64))
+    np.save(os.path.join(path, 'df.npy'), np.asarray(dfs, dtype=np.uint32))
+    np.save(os.path.join(path, 'doclens.npy'), np.asarray(doclens, dtype=np.uint32))
+    np.save(os.path.join(path, 'docids.npy'), np.asarray(docids, dtype=np.uint64))
+    np.save(os.path.join(path, 'docs.npy'), np.asarray(doc_offsets, dtype=np.uint64))
+
+
+def _merge_terms(segments):
+    """k-way merge of sorted segment lexicons, remapping local ids into the merged order"""
+    bases = np.cumsum([0] + [s.doc_count for s in segments[:-1]])
+    heap = [(seg.term_at(0), n, 0) for n, seg in enumerate(segments) if seg.num_terms]
+    heapq.heapify(heap)
+    while heap:
+        term = heap[0][0]
+        ids, tfs = [], []
+        while heap and heap[0][0] == term:
+            _, n, i = heapq.heappop(heap)
+            local, tf = segments[n].postings_at(i)
+            ids.append(local + bases[n])
+            tfs.append(tf)
+            if i + 1 < segments[n].num_terms:
+                heapq.heappush(heap, (segments[n].term_at(i + 1), n, i + 1))
+        # Ties pop in segment order, so the concatenated ids stay sorted
+        yield term, np.concatenate(ids), np.concatenate(tfs)
+
+
+class SearchIndex:
+    """
+    Incremental BM25 index over extracted document text.
+
+    Each add() writes a small immutable segment; whenever `merge_factor`
+    segments share a level they are merged in the background into one segment
+    of the next level, so segment count grows only logarithmically. The
+    manifest is swapped atomically and writers serialise on a lock file, so
+    several worker processes can share one index directory. Queries read the
+    memory-mapped segments; no document text is loaded except for snippets.
+    """
+
+    def __init__(self, path, merge_factor=10):
+        self.path = path
+        self.merge_factor = merge_factor
+        os.makedirs(path, exist_ok=True)
+        self._manifest_path = os.path.join(path, 'manifest.json')
+        self._lock = FileLock(os.path.join(path, 'write.lock'))
+        self._segments = {}
+        self._manifest = None
+        self._manifest_mtime = None
+        self._refresh_lock = threading.Lock()
+        self._merging = threading.Lock()
+
+    # -- manifest ---------------------------------------------------------
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path, encoding='utf-8') as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {"next_doc_id": 0, "next_segment": 0, "segments": []}
+
+    def _write_manifest(self, manifest):
+        tmp = self._manifest_path + f'.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump(manifest, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self._manifest_path)
+
+    def _current(self):
+        """Manifest and open segments, reloaded when another writer changed them"""
+        try:
+            return self._refresh()
+        except FileNotFoundError:
+            # A merge removed a segment between reading the manifest and opening it
+            with self._refresh_lock:
+                self._manifest = None
+            return self._refresh()
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self._manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        with self._refresh_lock:
+            if self._manifest is None or mtime != self._manifest_mtime:
+                manifest = self._read_manifest()
+                live = {s["name"] for s in manifest["segments"]}
+                segments = {name: seg for name, seg in self._segments.items() if name in live}
+                for name in live - segments.keys():
+                    segments[name] = Segment(os.path.join(self.path, name))
+                self._segments = segments
+                self._manifest, self._manifest_mtime = manifest, mtime
+            return self._manifest, [self._segments[s["name"]] for s in self._manifest["segments"]]
+
+    # -- writing ----------------------------------------------------------
+
+    def add(self, text, **metadata):
+        """Index one document and return its id; metadata is stored for search results"""
+        tokens = analyze(text)
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+
+        with self._lock:
+            manifest = self._read_manifest()
+            doc_id = manifest["next_doc_id"]
+            name = f"seg_{manifest['next_segment']:08d}"
+            payload = zlib.compress(json.dumps(
+                {"text": text, "added": time.time(), **metadata}, ensure_ascii=False).encode('utf-8'))
+            postings = ((t.encode('utf-8'), [0], [counts[t]])
+                        for t in sorted(counts, key=lambda t: t.encode('utf-8')))
+            write_segment(os.path.join(self.path, name), postings, [len(tokens)], [doc_id], [payload])
+            manifest["next_doc_id"] = doc_id + 1
+            manifest["next_segment"] += 1
+            manifest["segments"].append({"name": name, "level": 0, "doc_count": 1, "total_len": len(tokens)})
+            self._write_manifest(manifest)
+
+        if self._needs_merge(manifest) and self._merging.acquire(blocking=False):
+            threading.Thread(target=self._merge_in_background, daemon=True).start()
+        return doc_id
+
+    def _needs_merge(self, manifest):
+        levels = {}
+        for seg in manifest["segments"]:
+            levels[seg["level"]] = levels.get(seg["level"], 0) + 1
+        return any(n >= self.merge_factor for n in levels.values())
+
+    def _merge_in_background(self):
+        try:
+            while self.merge_once():
+                pass
+        except Exception:
+            log.exception("Search index merge failed")
+        finally:
+            self._merging.release()
+
+    def merge_once(self):
+        """Merge the oldest full level of segments; returns False when nothing is left to merge"""
+        # Only picking the segments and swapping the manifest hold the write lock;
+        # the merged segment is written outside it so add() is never stalled
+        with self._lock:
+            manifest = self._read_manifest()
+            by_level = {}
+            for seg in manifest["segments"]:
+                by_level.setdefault(seg["level"], []).append(seg)
+            full = [lvl for lvl, segs in by_level.items() if len(segs) >= self.merge_factor]
+            if not full:
+                return False
+            level = min(full)
+            chosen = by_level[level][:self.merge_factor]
+            # Reserve the output name so concurrent adds and merges never reuse it
+            name = f"seg_{manifest['next_segment']:08d}"
+            manifest["next_segment"] += 1
+            self._write_manifest(manifest)
+
+        segments = [Segment(os.path.join(self.path, s["name"])) for s in chosen]
+
+        def docs():
+            for seg in segments:
+                for i in range(seg.doc_count):
+                    yield bytes(seg._docs[seg.doc_offsets[i]:seg.doc_offsets[i + 1]])
+
+        write_segment(
+            os.path.join(self.path, name),
+            _merge_terms(segments),
+            np.concatenate([s.doclens for s in segments]),
+            np.concatenate([s.docids for s in segments]),
+            docs(),
+        )
+        del segments
+
+        merged_names = {s["name"] for s in chosen}
+        with self._lock:
+            manifest = self._read_manifest()
+            live = [s["name"] for s in manifest["segments"]]
+            if not merged_names.issubset(live):
+                # Another process merged some of these first; drop our copy and look again
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+                return True
+            # Segments are immutable and adds only append, so the chosen ones are unchanged
+            first = live.index(chosen[0]["name"])
+            remaining = [s for s in manifest["segments"] if s["name"] not in merged_names]
+            remaining.insert(first, {
+                "name": name,
+                "level": level + 1,
+                "doc_count": sum(s["doc_count"] for s in chosen),
+                "total_len": sum(s["total_len"] for s in chosen),
+            })
+            manifest["segments"] = remaining
+            self._write_manifest(manifest)
+            for old in merged_names:
+                # Readers that still have these mapped keep working (POSIX unlink semantics)
+                shutil.rmtree(os.path.join(self.path, old), ignore_errors=True)
+        return True
+
+    # -- reading ----------------------------------------------------------
+
+    def stats(self):
+        manifest, _ = self._current()
+        return {
+            "documents": manifest["next_doc_id"],
+            "segments": len(manifest["segments"]),
+        }
+
+    def search(self, query, k=10, snippet_chars=240):
+        """
+        BM25-ranked search. Quoted phrases must appear verbatim (case-insensitive)
+        in a result; their terms also count towards the score.
+        """
+        started = time.perf_counter()
+        phrases = [p.strip().lower() for p in _PHRASE_RE.findall(query) if p.strip()]
+        terms = list(dict.fromkeys(analyze(query)))
+        if not terms:
+            return {"query": query, "total_hits": 0, "took_ms": 0.0, "results": []}
+
+        manifest, segments = self._current()
+        total_docs = sum(s["doc_count"] for s in manifest["segments"])
+        if total_docs == 0:
+            return {"query": query, "total_hits": 0, "took_ms": 0.0, "results": []}
+        avgdl = sum(s["total_len"] for s in manifest["segments"]) / total_docs
+
+        per_segment = [{t: seg.postings(t) for t in terms} for seg in segments]
+        df = {t: sum(len(p[t][0]) for p in per_segment if p[t] is not None) for t in terms}
+
+        # A phrase can only occur in documents holding all of its terms
+        phrase_terms = set(analyze(' '.join(phrases)))
+        candidates = []
+        total_hits = 0
+        for seg, postings in zip(segments, per_segment):
+            scores = None
+            norm = K1 * (1 - B + B * np.asarray(seg.doclens, dtype=np.float32) / avgdl)
+            for term, hit in postings.items():
+                if hit is None:
+                    continue
+                ids, tfs = hit
+                idf = np.log(1.0 + (total_docs - df[term] + 0.5) / (df[term] + 0.5))
+                if scores is None:
+                    scores = np.zeros(seg.doc_count, dtype=np.float32)
+                scores[ids] += idf * tfs * (K1 + 1) / (tfs + norm[ids])
+            if scores is None:
+                continue
+            matched = np.flatnonzero(scores)
+            if phrases:
+                # Verify every document that could hold the phrases, not just the top
+                # BM25 ones, so low-ranked matches are found and counted
+                has_terms = np.ones(seg.doc_count, dtype=bool)
+                for term in phrase_terms:
+                    present = np.zeros(seg.doc_count, dtype=bool)
+                    if postings[term] is not None:
+                        present[postings[term][0]] = True
+                    has_terms &= present
+                matched = np.array([i for i in matched[has_terms[matched]]
+                                    if _contains_phrases(seg.document(int(i))["text"], phrases)],
+                                   dtype=np.int64)
+            total_hits += len(matched)
+            if len(matched) > k:
+                matched = matched[np.argpartition(-scores[matched], k)[:k]]
+            candidates.extend((float(scores[i]), seg, int(i)) for i in matched)
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        results = []
+        for score, seg, local in candidates[:k]:
+            doc = seg.document(local)
+            text = doc.pop("text")
+            results.append({
+                "doc_id": int(seg.docids[local]),
+                "score": round(score, 4),
+                "snippet": make_snippet(text, terms, phrases, snippet_chars),
+                **doc,
+            })
+
+        return {
+            "query": query,
+            "total_hits": total_hits,
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+            "results": results,
+        }
+
+
+def _contains_phrases(text, phrases):
+    lowered = text.lower()
+    return all(p in lowered for p in phrases)
+
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'search_index')
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """Open the shared judgment index (SEARCH_INDEX_DIR) on first use"""
+    global _index
+    if _index is None:
+        # Batch summaries call this from several pool threads at once
+        with _index_lock:
+            if _index is None:
+                _index = SearchIndex(os.getenv('SEARCH_INDEX_DIR') or DEFAULT_INDEX_DIR)
+    return _index
+
+
+def make_snippet(text, terms, phrases=(), width=240):
+    """Window of `width` chars with the most query-term hits, matches wrapped in <mark>"""
+    patterns = [re.escape(p) for p in phrases] + [r'\b' + re.escape(t) + r'\b' for t in terms]
+    matcher = re.compile('|'.join(patterns), re.IGNORECASE)
+    hits = [m.start() for m in matcher.finditer(text)]
+    if not hits:
+        start = 0
+    else:
+        starts = np.asarray(hits)
+        # Most hits within one window starting at a hit
+        counts = np.searchsorted(starts, starts + width) - np.arange(len(starts))
+        start = max(0, int(starts[int(np.argmax(counts))]) - width // 6)
+    window = text[start:start + width]
+    pieces = []
+    last = 0
+    for m in matcher.finditer(window):
+        pieces.append(html.escape(window[last:m.start()]))
+        pieces.append('<mark>' + html.escape(m.group(0)) + '</mark>')
+        last = m.end()
+    pieces.append(html.escape(window[last:]))
+    snippet = re.sub(r'\s+', ' ', ''.join(pieces)).strip()
+    return ('…' if start > 0 else '') + snippet + ('…' if start + width < len(text) else '')
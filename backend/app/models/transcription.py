@@ -0,0 +1,253 @@
+import io
+import os
+import wave
+import bisect
+from abc import ABC, abstractmethod
+from collections import deque
+import numpy as np
+from openai import OpenAI
+
+
+class SpeechSegment:
+    """A run of voiced audio with its position (seconds) in the recording"""
+
+    __slots__ = ("start", "end", "samples", "sample_rate")
+
+    def __init__(self, start, end, samples, sample_rate):
+        self.start = start
+        self.end = end
+        self.samples = samples
+        self.sample_rate = sample_rate
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def to_wav_bytes(self):
+        buf = io.BytesIO()
+        with wave.open(buf, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes((np.clip(self.samples, -1.0, 1.0) * 32767).astype('<i2').tobytes())
+        return buf.getvalue()
+
+
+class EnergyVAD:
+    """
+    Frame-level voice activity detector using short-time energy and zero-crossing rate.
+
+    A frame is voiced when its energy is `threshold_db` above an adaptive noise
+    floor and its zero-crossing rate is below that of broadband hiss. A segment
+    opens after `min_speech_ms` of voiced frames (with `pad_ms` of pre-roll) and
+    closes after `hangover_ms` of silence or when it reaches `max_segment_s`,
+    so at most one segment of audio is buffered at a time.
+    """
+
+    def __init__(self, sample_rate, frame_ms=30, threshold_db=12.0, min_db=-55.0, max_zcr=0.45,
+                 min_speech_ms=150, hangover_ms=400, pad_ms=150, max_segment_s=30.0):
+        self.sample_rate = sample_rate
+        self.frame_len = max(1, int(sample_rate * frame_ms / 1000))
+        self.threshold_db = threshold_db
+        self.min_db = min_db
+        self.max_zcr = max_zcr
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.max_segment_frames = max(1, int(max_segment_s * 1000) // frame_ms)
+        self.pad_frames = pad_ms // frame_ms
+        self._preroll = deque(maxlen=self.pad_frames + self.min_speech_frames)
+        self._leftover = np.zeros(0, dtype=np.float32)
+        self._noise_floor = None
+        self._frame_index = 0
+        self._segment = None
+        self._segment_start = 0
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._segment_voiced = 0
+
+    @property
+    def processed_seconds(self):
+        return self._frame_index * self.frame_len / self.sample_rate
+
+    def _classify(self, frames):
+        energy = np.sqrt(np.mean(frames * frames, axis=1))
+        db = 20.0 * np.log10(energy + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frames.shape[1]
+        return db, zcr
+
+    def _emit(self, trim_frames=0):
+        voiced = self._segment_voiced
+        frames = self._segment[:len(self._segment) - trim_frames] if trim_frames else self._segment
+        self._segment = None
+        self._segment_voiced = 0
+        if not voiced or not frames:
+            return None
+        start = self._segment_start * self.frame_len / self.sample_rate
+        end = (self._segment_start + len(frames)) * self.frame_len / self.sample_rate
+        return SpeechSegment(start, end, np.concatenate(frames), self.sample_rate)
+
+    def feed(self, samples):
+        """Consume a chunk of float32 mono samples; yield any segments it completes"""
+        buf = np.concatenate([self._leftover, samples]) if len(self._leftover) else samples
+        n = len(buf) // self.frame_len
+        self._leftover = buf[n * self.frame_len:].copy()
+        if n == 0:
+            return
+        frames = buf[:n * self.frame_len].reshape(n, self.frame_len)
+        db, zcr = self._classify(frames)
+
+        for frame, frame_db, frame_zcr in zip(frames, db, zcr):
+            if self._noise_floor is None:
+                self._noise_floor = frame_db
+            voiced = (frame_db > self._noise_floor + self.threshold_db
+                      and frame_db > self.min_db and frame_zcr < self.max_zcr)
+            if not voiced:
+                # Track the floor quickly downwards and slowly upwards
+                rate = 0.5 if frame_db < self._noise_floor else 0.02
+                self._noise_floor += rate * (frame_db - self._noise_floor)
+
+            if self._segment is None:
+                self._preroll.append(frame)
+                self._voiced_run = self._voiced_run + 1 if voiced else 0
+                if self._voiced_run >= self.min_speech_frames:
+                    self._segment = list(self._preroll)
+                    self._segment_start = self._frame_index + 1 - len(self._segment)
+                    self._segment_voiced = self._voiced_run
+                    self._preroll.clear()
+                    self._silent_run = 0
+            else:
+                self._segment.append(frame)
+                self._silent_run = 0 if voiced else self._silent_run + 1
+                self._segment_voiced += int(voiced)
+                segment = None
+                if self._silent_run >= self.hangover_frames:
+                    self._voiced_run = 0
+                    segment = self._emit(trim_frames=max(0, self._silent_run - self.pad_frames))
+                elif len(self._segment) >= self.max_segment_frames:
+                    segment = self._emit()
+                    # Long utterance: keep going without waiting for min_speech again
+                    self._segment = []
+                    self._segment_start = self._frame_index + 1
+                if segment is not None:
+                    yield segment
+            self._frame_index += 1
+
+    def flush(self):
+        """Yield the segment still open at end of stream, if any"""
+        if self._segment:
+            segment = self._emit(trim_frames=max(0, self._silent_run - self.pad_frames))
+            if segment is not None:
+                yield segment
+        self._segment = None
+
+
+class ASRBackend(ABC):
+    """Recognizes a batch of speech segments"""
+
+    name = "base"
+
+    @abstractmethod
+    def transcribe_batch(self, segments):
+        """One transcript per segment, in the same order"""
+
+
+class StubASRBackend(ASRBackend):
+    """Deterministic backend for development and tests; reports what it was sent"""
+
+    name = "stub"
+
+    def transcribe_batch(self, segments):
+        return [f"[speech {s.start:.2f}s-{s.end:.2f}s]" for s in segments]
+
+
+class WhisperBackend(ASRBackend):
+    """
+    OpenAI Whisper API, one request per batch.
+
+    The batch's segments are joined into a single in-memory 16-bit WAV with a
+    short silence between them, and each timestamped segment Whisper returns
+    is credited to the input segment its midpoint falls in.
+    """
+
+    name = "whisper"
+    gap_seconds = 1.0
+
+    def __init__(self, model="whisper-1"):
+        self.model = model
+        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+
+    def transcribe_batch(self, segments):
+        if not segments:
+            return []
+        sample_rate = segments[0].sample_rate
+        gap = np.zeros(int(self.gap_seconds * sample_rate), dtype=np.float32)
+        audio, bounds, offset = [], [], 0.0
+        for segment in segments:
+            audio += [segment.samples, gap]
+            offset += len(segment.samples) / sample_rate
+            # Returned text belongs to this segment up to the middle of the following gap
+            bounds.append(offset + self.gap_seconds / 2)
+            offset += self.gap_seconds
+        batch = SpeechSegment(0.0, offset, np.concatenate(audio), sample_rate)
+        response = self.client.audio.transcriptions.create(
+            model=self.model,
+            file=("batch.wav", batch.to_wav_bytes()),
+            response_format="verbose_json",
+            timestamp_granularities=["segment"],
+        )
+        texts = [[] for _ in segments]
+        for piece in response.segments or []:
+            middle = (piece.start + piece.end) / 2
+            index = min(bisect.bisect_left(bounds, middle), len(segments) - 1)
+            texts[index].append(piece.text.strip())
+        return [" ".join(t for t in pieces if t) for pieces in texts]
+
+
+def make_asr_backend(name=None):
+    name = name or os.getenv('ASR_BACKEND') or ('whisper' if os.getenv('OPENAI_API_KEY') else 'stub')
+    if name == 'whisper':
+        return WhisperBackend()
+    if name == 'stub':
+        return StubASRBackend()
+    raise ValueError(f"Unknown ASR backend: {name}")
+
+
+def transcribe_stream(chunks, sample_rate, backend, batch_size=4, batch_seconds=60.0, vad=None):
+    """
+    Run decoded audio chunks through VAD and the recognizer.
+
+    Yields {"start", "end", "text"} per speech segment as each batch completes,
+    then a final {"done": True, ...} summary. Silence never reaches the backend
+    and at most one batch of speech is held in memory.
+    """
+    vad = vad or EnergyVAD(sample_rate)
+    pending = []
+    speech_seconds = 0.0
+    segments = 0
+
+    def run_batch(batch):
+        for segment, text in zip(batch, backend.transcribe_batch(batch)):
+            yield {"start": round(segment.start, 2), "end": round(segment.end, 2), "text": text}
+
+    for chunk in chunks:
+        for segment in vad.feed(chunk):
+            pending.append(segment)
+            speech_seconds += segment.duration
+            segments += 1
+            if len(pending) >= batch_size or sum(s.duration for s in pending) >= batch_seconds:
+                yield from run_batch(pending)
+                pending = []
+    for segment in vad.flush():
+        pending.append(segment)
+        speech_seconds += segment.duration
+        segments += 1
+    if pending:
+        yield from run_batch(pending)
+
+    yield {
+        "done": True,
+        "segments": segments,
+        "audio_seconds": round(vad.processed_seconds, 2),
+        "speech_seconds": round(speech_seconds, 2),
+    }
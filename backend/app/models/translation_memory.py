@@ -0,0 +1,208 @@
+import os
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+from openai import OpenAI
+from models.extractive_summarizer import split_sentences
+from models.minhash import MinHasher, MinHashLSH, normalize_text
+
+log = logging.getLogger(__name__)
+
+SUPPORTED_LANGUAGES = ("Hindi", "Kannada", "Tamil", "Telugu")
+
+
+class TranslationBackend(ABC):
+    """Translates the segments the memory could not answer"""
+
+    name = "base"
+    # Whether results are real translations worth writing to the memory's file;
+    # others are still cached, but only for the life of the process
+    persistent = True
+
+    @abstractmethod
+    def translate_batch(self, segments, language):
+        """Translations of segments into language, in the same order"""
+
+
+class DummyBackend(TranslationBackend):
+    """Local, deterministic backend for development and tests"""
+
+    name = "dummy"
+    persistent = False
+
+    def translate_batch(self, segments, language):
+        return [dummy_translation(segment, language) for segment in segments]
+
+
+def dummy_translation(segment, language):
+    return f"[{language}] {segment}"
+
+
+class OpenAIBackend(TranslationBackend):
+    """Translates a batch of segments in one chat completion, as a JSON array in and out"""
+
+    name = "openai"
+
+    def __init__(self, model="gpt-3.5-turbo"):
+        self.model = model
+        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+
+    def translate_batch(self, segments, language):
+        prompt = (
+            f"Translate each English courtroom sentence in this JSON array into {language}. "
+            "Reply with only a JSON array of the translations, in the same order.\n\n"
+            + json.dumps(segments, ensure_ascii=False)
+        )
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You are a certified legal translator for Indian courts."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0
+        )
+        translated = json.loads(response.choices[0].message.content)
+        if not isinstance(translated, list) or len(translated) != len(segments):
+            raise ValueError("Translation backend returned a mismatched batch")
+        return [str(t) for t in translated]
+
+
+def make_backend(name=None):
+    name = name or os.getenv('TRANSLATION_BACKEND') or ('openai' if os.getenv('OPENAI_API_KEY') else 'dummy')
+    if name == 'openai':
+        return OpenAIBackend()
+    if name == 'dummy':
+        return DummyBackend()
+    raise ValueError(f"Unknown translation backend: {name}")
+
+
+class TranslationMemory:
+    """
+    Sentence-level translation memory.
+
+    Exact matches come from a dict keyed on the normalized source sentence; near
+    matches come from a per-language MinHash LSH index over character n-grams.
+    Entries can be persisted to an append-only JSONL file.
+    """
+
+    def __init__(self, path=None, fuzzy_threshold=0.9, num_perm=64, bands=16):
+        self.path = path
+        self.fuzzy_threshold = fuzzy_threshold
+        self._hasher = MinHasher(num_perm=num_perm)
+        self._num_perm = num_perm
+        self._bands = bands
+        self._exact = {}
+        self._fuzzy = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._exact)
+
+    def _load(self, path):
+        with open(path, encoding='utf-8') as fh:
+            for line in fh:
+                if line.strip():
+                    entry = json.loads(line)
+                    # Placeholders stored by older versions must not be served as hits
+                    if entry["target"] == dummy_translation(entry["source"], entry["language"]):
+                        continue
+                    self._insert(entry["language"], entry["source"], entry["target"])
+
+    def _insert(self, language, source, target):
+        key = (language, normalize_text(source))
+        if key in self._exact:
+            return False
+        self._exact[key] = target
+        index = self._fuzzy.get(language)
+        if index is None:
+            index = self._fuzzy[language] = MinHashLSH(num_perm=self._num_perm, bands=self._bands)
+        index.add(key[1], self._hasher.signature(source))
+        return True
+
+    def add(self, language, source, target, persist=True):
+        with self._lock:
+            if self._insert(language, source, target) and persist and self.path:
+                with open(self.path, 'a', encoding='utf-8') as fh:
+                    fh.write(json.dumps({"language": language, "source": source, "target": target},
+                                        ensure_ascii=False) + '\n')
+
+    def lookup(self, language, source):
+        """Return (target, match_type, similarity), or (None, None, 0.0) on a miss"""
+        normalized = normalize_text(source)
+        signature = self._hasher.signature(source)
+        with self._lock:
+            target = self._exact.get((language, normalized))
+            if target is not None:
+                return target, "exact", 1.0
+            index = self._fuzzy.get(language)
+            if index is not None:
+                matches = index.query(signature, self.fuzzy_threshold)
+                if matches:
+                    key, similarity = matches[0]
+                    return self._exact[(language, key)], "fuzzy", similarity
+        return None, None, 0.0
+
+
+class Translator:
+    """Serves translations from the memory and sends only misses to the backend, in batches"""
+
+    def __init__(self, memory, backend, batch_size=32):
+        self.memory = memory
+        self.backend = backend
+        self.batch_size = batch_size
+        self.stats = {"exact": 0, "fuzzy": 0, "backend": 0}
+        self._stats_lock = threading.Lock()
+        if not backend.persistent:
+            log.warning("Translation backend '%s' returns placeholders: they are cached for this "
+                        "process only and never written to the translation memory file", backend.name)
+
+    def stats_snapshot(self):
+        """Segment counts by match type and the memory hit rate, read consistently"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        total = sum(stats.values())
+        hit_rate = (stats["exact"] + stats["fuzzy"]) / total if total else 0.0
+        return stats, hit_rate
+
+    def hit_rate(self):
+        return self.stats_snapshot()[1]
+
+    def translate(self, text, language):
+        segments = split_sentences(text)
+        results = [None] * len(segments)
+        misses = {}
+        counts = {"exact": 0, "fuzzy": 0, "backend": 0}
+
+        for i, segment in enumerate(segments):
+            target, match, similarity = self.memory.lookup(language, segment)
+            if target is None:
+                misses.setdefault(normalize_text(segment), []).append(i)
+                continue
+            results[i] = {"source": segment, "translation": target, "match": match,
+                          "similarity": round(similarity, 3)}
+            counts[match] += 1
+
+        pending = [segments[idxs[0]] for idxs in misses.values()]
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            for source, target in zip(batch, self.backend.translate_batch(batch, language)):
+                self.memory.add(language, source, target, persist=self.backend.persistent)
+                for i in misses[normalize_text(source)]:
+                    results[i] = {"source": segments[i], "translation": target, "match": "backend",
+                                  "similarity": None}
+                    counts["backend"] += 1
+
+        with self._stats_lock:
+            for match, n in counts.items():
+                self.stats[match] += n
+
+        answered = counts["exact"] + counts["fuzzy"]
+        return {
+            "translated_text": ' '.join(r["translation"] for r in results),
+            "segments": results,
+            "hit_rate": round(answered / len(segments), 3) if segments else 0.0,
+        }
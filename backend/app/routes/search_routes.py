@@ -0,0 +1,16 @@
+from flask import Blueprint, request, jsonify
+from models.search_index import get_search_index
+
+search_bp = Blueprint('search', __name__)
+
+@search_bp.route('/search', methods=['GET'])
+def search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "No query provided"}), 400
+    k = request.args.get('k', 10, type=int)
+    return jsonify(get_search_index().search(query, k=max(1, min(k, 100))))
+
+@search_bp.route('/search/stats', methods=['GET'])
+def search_stats():
+    return jsonify(get_search_index().stats())
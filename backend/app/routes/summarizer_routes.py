@@ -1,8 +1,17 @@
-from flask import Blueprint, request, jsonify
-from werkzeug.utils import secure_filename
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
 from models.summarizer_model import summarize_text
-from utils.file_handler import extract_text_from_pdf, extract_text_from_docx, summarize_extracted_text
+from utils.file_handler import extract_text_from_pdf, extract_text_from_docx
+from utils.upload_handler import upload_extension, detach_upload_stream, zip_documents
+from utils.document_pipeline import process_document, summarize_batch
+import json
 import os
+import zipfile
+
+ALLOWED_EXTENSIONS = {'pdf', 'docx'}
+
+# A case bundle is many documents in one request, so it gets its own body limit
+BATCH_MAX_CONTENT_LENGTH = int(float(os.getenv('SUMMARIZER_MAX_BATCH_MB', '200')) * 1024 * 1024)
 
 summarizer_bp = Blueprint('summarizer', __name__)
 
@@ -23,23 +32,83 @@ def summarize_file():
     file = request.files['file']
     if file.filename == '':
         return jsonify({"error": "No file selected"}), 400
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join('uploads', filename)
-        file.save(filepath)
-        if file.filename.lower().endswith('.pdf'):
-            text = extract_text_from_pdf(filepath)
-        elif file.filename.lower().endswith('.docx'):
-            text = extract_text_from_docx(filepath)
-        else:
-            os.remove(filepath)  # clean up
-            return jsonify({"error": "Unsupported file type"}), 400
-
-        # Use OpenAI to summarize the extracted text
-        summary = summarize_extracted_text(text)
-        os.remove(filepath)  # clean up
-        return jsonify({"summary": summary})
-    return jsonify({"error": "Unsupported file type"}), 400
+    if not allowed_file(file.filename):
+        return jsonify({"error": "Unsupported file type"}), 400
+    mode = request.form.get('mode')
+    if mode not in (None, 'llm', 'extractive'):
+        return jsonify({"error": "Unsupported mode"}), 400
+
+    # The upload is already spooled (memory, or an anonymous temp file past the
+    # spool limit), so extract straight from the stream and let Werkzeug close it
+    text = extract_text_from_upload(file)
+
+    # Reuse a near-duplicate's summary, or index and summarize (locally or with
+    # OpenAI, after trimming to the most salient sentences)
+    return jsonify(process_document(text, file.filename, mode=mode))
+
+@summarizer_bp.route('/summarize-batch', methods=['POST'])
+def summarize_batch_files():
+    """
+    Summarize several documents (multipart `files`, each a PDF, DOCX or zip of
+    them). Streams one NDJSON line per document as it finishes, then a final
+    line with "done": true.
+    """
+    request.max_content_length = BATCH_MAX_CONTENT_LENGTH
+    uploads = [f for f in request.files.getlist('files') + request.files.getlist('file') if f.filename]
+    if not uploads:
+        return jsonify({"error": "No files provided"}), 400
+    mode = request.form.get('mode')
+    if mode not in (None, 'llm', 'extractive'):
+        return jsonify({"error": "Unsupported mode"}), 400
+
+    max_document_bytes = current_app.config['MAX_CONTENT_LENGTH']
+    owned = []
+    documents = []
+    try:
+        for upload in uploads:
+            stream = detach_upload_stream(upload)
+            owned.append(stream)
+            if upload_extension(upload.filename) == 'zip':
+                documents.extend(zip_documents(stream, upload.filename, ALLOWED_EXTENSIONS, max_document_bytes))
+            else:
+                documents.append((upload.filename, upload_reader(upload.filename, stream, max_document_bytes)))
+    except (zipfile.BadZipFile, ValueError) as e:
+        for stream in owned:
+            stream.close()
+        return jsonify({"error": f"Invalid archive: {str(e)}"}), 400
+
+    def lines():
+        try:
+            for item in summarize_batch(documents, mode=mode):
+                yield json.dumps(item, ensure_ascii=False) + '\n'
+        finally:
+            for stream in owned:
+                stream.close()
+
+    return Response(stream_with_context(lines()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def upload_reader(filename, stream, max_bytes):
+    # Same per-document cap as zip members: the batch body limit is far above it
+    def read():
+        if not allowed_file(filename):
+            raise ValueError("Unsupported file type")
+        data = stream.read(max_bytes + 1)
+        if len(data) > max_bytes:
+            raise ValueError("File too large")
+        return data
+    return read
+
+@summarizer_bp.app_errorhandler(RequestEntityTooLarge)
+def upload_too_large(error):
+    # The limit actually enforced: /transcribe and /summarize-batch raise it per request
+    limit = request.max_content_length
+    return jsonify({"error": "Upload too large", "max_bytes": limit}), 413
+
+def extract_text_from_upload(file):
+    if upload_extension(file.filename) == 'pdf':
+        return extract_text_from_pdf(file.stream)
+    return extract_text_from_docx(file.stream)
 
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'pdf', 'docx'}
+    return upload_extension(filename) in ALLOWED_EXTENSIONS
@@ -0,0 +1,152 @@
+import shutil
+import struct
+import subprocess
+import threading
+import numpy as np
+
+# Sample rate ffmpeg resamples compressed formats to (what speech recognizers expect)
+TARGET_SAMPLE_RATE = 16000
+CHUNK_BYTES = 64 * 1024
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_IEEE_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _read_exact(stream, n):
+    data = b''
+    while len(data) < n:
+        block = stream.read(n - len(data))
+        if not block:
+            break
+        data += block
+    return data
+
+
+def _skip(stream, n):
+    while n > 0:
+        block = stream.read(min(n, CHUNK_BYTES))
+        if not block:
+            return
+        n -= len(block)
+
+
+def _to_float_mono(raw, dtype, channels):
+    if dtype == np.uint8:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif dtype == np.float32:
+        samples = np.frombuffer(raw, dtype='<f4').astype(np.float32)
+    else:
+        info = np.iinfo(dtype)
+        samples = np.frombuffer(raw, dtype=np.dtype(dtype).newbyteorder('<')).astype(np.float32) / -float(info.min)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def _iter_wav_data(stream, remaining, frame_bytes, dtype, channels, chunk_bytes):
+    carry = b''
+    while remaining is None or remaining > 0:
+        want = chunk_bytes if remaining is None else min(chunk_bytes, remaining)
+        block = stream.read(want)
+        if not block:
+            break
+        if remaining is not None:
+            remaining -= len(block)
+        block = carry + block
+        usable = len(block) - len(block) % frame_bytes
+        carry = block[usable:]
+        if usable:
+            yield _to_float_mono(block[:usable], dtype, channels)
+
+
+def _open_wav(header, stream, chunk_bytes):
+    """Parse RIFF chunks sequentially so non-seekable request bodies work"""
+    fmt = None
+    while True:
+        chunk_header = _read_exact(stream, 8)
+        if len(chunk_header) < 8:
+            raise ValueError("WAV file has no data chunk")
+        chunk_id, size = chunk_header[:4], struct.unpack('<I', chunk_header[4:])[0]
+        if chunk_id == b'fmt ':
+            body = _read_exact(stream, size + (size & 1))
+            tag, channels, rate, _, _, bits = struct.unpack('<HHIIHH', body[:16])
+            if tag == _WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                tag = struct.unpack('<H', body[24:26])[0]
+            fmt = (tag, channels, rate, bits)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise ValueError("WAV data chunk precedes fmt chunk")
+            tag, channels, rate, bits = fmt
+            dtypes = {(_WAVE_FORMAT_PCM, 8): np.uint8, (_WAVE_FORMAT_PCM, 16): np.int16,
+                      (_WAVE_FORMAT_PCM, 32): np.int32, (_WAVE_FORMAT_IEEE_FLOAT, 32): np.float32}
+            dtype = dtypes.get((tag, bits))
+            if dtype is None or channels < 1:
+                raise ValueError(f"Unsupported WAV sample format (format {tag}, {bits} bits)")
+            # Streamed WAVs often carry a 0 or 0xFFFFFFFF placeholder size; read to EOF then
+            remaining = None if size in (0, 0xFFFFFFFF) else size
+            frame_bytes = channels * bits // 8
+            return rate, _iter_wav_data(stream, remaining, frame_bytes, dtype, channels, chunk_bytes)
+        else:
+            _skip(stream, size + (size & 1))
+
+
+def _iter_ffmpeg(head, stream, sample_rate, chunk_bytes):
+    proc = subprocess.Popen(
+        ['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', 'pipe:0',
+         '-f', 's16le', '-ac', '1', '-ar', str(sample_rate), 'pipe:1'],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+
+    def feed():
+        try:
+            proc.stdin.write(head)
+            while True:
+                block = stream.read(chunk_bytes)
+                if not block:
+                    break
+                proc.stdin.write(block)
+        except (BrokenPipeError, ValueError):
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except Exception:
+                pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    carry = b''
+    try:
+        while True:
+            block = proc.stdout.read(chunk_bytes)
+            if not block:
+                break
+            block = carry + block
+            usable = len(block) - len(block) % 2
+            carry = block[usable:]
+            if usable:
+                yield _to_float_mono(block[:usable], np.int16, 1)
+    finally:
+        proc.kill()
+        proc.wait()
+        feeder.join(timeout=1)
+
+
+def open_pcm_stream(stream, chunk_bytes=CHUNK_BYTES):
+    """
+    Decode a binary audio stream incrementally.
+
+    Returns (sample_rate, chunks) where chunks yields float32 mono arrays in
+    [-1, 1]. PCM/float WAV is decoded natively at its own rate; anything else
+    is piped through ffmpeg and resampled to TARGET_SAMPLE_RATE. Only one
+    chunk is held in memory at a time.
+    """
+    header = _read_exact(stream, 12)
+    if len(header) == 12 and header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return _open_wav(header, stream, chunk_bytes)
+    if not header:
+        raise ValueError("No audio provided")
+    if shutil.which('ffmpeg') is None:
+        raise ValueError("Only PCM WAV audio is supported when ffmpeg is not installed")
+    return TARGET_SAMPLE_RATE, _iter_ffmpeg(header, stream, TARGET_SAMPLE_RATE, chunk_bytes)
@@ -0,0 +1,133 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from models.duplicate_index import get_duplicate_index
+from models.search_index import get_search_index
+from utils.file_handler import extract_text_from_bytes, resolve_mode, summarize_document, summary_failed
+
+log = logging.getLogger(__name__)
+
+# Documents summarized at once per worker process, across all batch requests
+BATCH_CONCURRENCY = int(os.getenv('SUMMARIZER_BATCH_CONCURRENCY', '4'))
+# Processes for PDF/DOCX extraction, which is CPU-bound pure Python
+EXTRACT_WORKERS = int(os.getenv('SUMMARIZER_EXTRACT_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+_summary_pool = None
+_extract_pool = None
+_pool_lock = threading.Lock()
+
+def extraction_failed(text):
+    return not text.strip() or text.startswith("Error extracting")
+
+def index_document(text, filename):
+    """Make the extracted text searchable; indexing problems never fail a summary"""
+    try:
+        get_search_index().add(text, filename=filename)
+    except Exception:
+        log.exception("Failed to index %s", filename)
+
+def process_document(text, filename, mode=None):
+    """
+    Summarize one extracted document.
+
+    A near-duplicate of an already summarized document (same mode) gets the
+    stored summary back, flagged with `near_duplicate`, instead of a new
+    summarization; otherwise the text is indexed for search, summarized and
+    remembered for future duplicate checks.
+    """
+    if extraction_failed(text):
+        return summarize_document(text, mode=mode)
+
+    mode = resolve_mode(mode)
+    duplicates = get_duplicate_index()
+    sig = duplicates.signature(text)
+    match = duplicates.lookup(sig, mode=mode)
+    if match is not None:
+        return {
+            **match["result"],
+            "near_duplicate": {
+                # An opaque id, never the other upload's filename
+                "id": match["key"],
+                "similarity": match["similarity"],
+                "summarized_at": match["added"],
+            },
+        }
+
+    index_document(text, filename)
+    result = summarize_document(text, mode=mode)
+    if not summary_failed(result):
+        try:
+            duplicates.add(sig, result, filename=filename)
+        except Exception:
+            log.exception("Failed to record %s for duplicate detection", filename)
+    return result
+
+
+def get_summary_pool():
+    global _summary_pool
+    if _summary_pool is None:
+        with _pool_lock:
+            if _summary_pool is None:
+                _summary_pool = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix='summarize')
+    return _summary_pool
+
+def get_extract_pool():
+    global _extract_pool
+    if _extract_pool is None:
+        # Called from the summary pool's threads, so creation must not race
+        with _pool_lock:
+            if _extract_pool is None:
+                # spawn, not fork: the parent is multi-threaded (WSGI threads, summary pool)
+                _extract_pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+    return _extract_pool
+
+def _process_upload(index, filename, read, mode):
+    started = time.perf_counter()
+    try:
+        data = read()
+        text = get_extract_pool().submit(extract_text_from_bytes, filename, data).result()
+        del data
+        if extraction_failed(text):
+            raise ValueError(text.strip() or "No text could be extracted")
+        result = process_document(text, filename, mode=mode)
+        if summary_failed(result):
+            raise RuntimeError(result["summary"])
+        line = {"index": index, "filename": filename, "status": "ok", **result}
+    except Exception as e:
+        line = {"index": index, "filename": filename, "status": "error", "error": str(e)}
+    line["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return line
+
+def summarize_batch(documents, mode=None):
+    """
+    Summarize (filename, read) pairs concurrently, yielding one result per
+    document as it finishes and then a {"done": True, ...} summary.
+
+    read() is only called once a summary slot is free, so at most
+    BATCH_CONCURRENCY documents are held in memory. A failing document yields
+    an error result and never affects the others.
+    """
+    started = time.perf_counter()
+    futures = [get_summary_pool().submit(_process_upload, i, name, read, mode)
+               for i, (name, read) in enumerate(documents)]
+    succeeded = 0
+    try:
+        for future in as_completed(futures):
+            line = future.result()
+            succeeded += line["status"] == "ok"
+            yield line
+    finally:
+        # Client went away: drop documents that have not started yet
+        for future in futures:
+            future.cancel()
+    yield {
+        "done": True,
+        "documents": len(futures),
+        "succeeded": succeeded,
+        "failed": len(futures) - succeeded,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
@@ -1,40 +1,53 @@
+import io
 import pdfplumber
 from docx import Document
 import os
 from openai import OpenAI
 from dotenv import load_dotenv
 import httpx
+from models.extractive_summarizer import estimate_tokens, reduce_text, extractive_summary
 
 # Load environment variables
 load_dotenv()
 
-def extract_text_from_pdf(file_path):
-    """Extract text from PDF file"""
+# Upper bound on document tokens sent to the completion API after extractive reduction
+LLM_INPUT_TOKEN_BUDGET = int(os.getenv('SUMMARIZER_LLM_TOKEN_BUDGET', '1500'))
+
+# Returned in place of a summary when there is too little text; not a real summary
+TOO_SHORT_SUMMARY = "Extracted text is too short to summarize."
+
+def extract_text_from_pdf(source):
+    """Extract text from a PDF file path or seekable binary stream"""
     try:
-        with pdfplumber.open(file_path) as pdf:
-            text = ''
-            for page in pdf.pages:
-                text += page.extract_text() or ''
+        with pdfplumber.open(source) as pdf:
+            text = ''.join(page.extract_text() or '' for page in pdf.pages)
         return text
     except Exception as e:
         return f"Error extracting PDF text: {str(e)}"
 
-def extract_text_from_docx(file_path):
-    """Extract text from DOCX file"""
+def extract_text_from_docx(source):
+    """Extract text from a DOCX file path or seekable binary stream"""
     try:
-        doc = Document(file_path)
-        text = ''
-        for para in doc.paragraphs:
-            text += para.text + '\n'
+        doc = Document(source)
+        text = ''.join(para.text + '\n' for para in doc.paragraphs)
         return text
     except Exception as e:
         return f"Error extracting DOCX text: {str(e)}"
 
+def extract_text_from_bytes(filename, data):
+    """Extract text from an in-memory PDF/DOCX; module-level so worker processes can run it"""
+    name = filename.lower()
+    if name.endswith('.pdf'):
+        return extract_text_from_pdf(io.BytesIO(data))
+    if name.endswith('.docx'):
+        return extract_text_from_docx(io.BytesIO(data))
+    return "Error extracting text: unsupported file type"
+
 def summarize_extracted_text(text, max_len=150, min_len=30):
     """Use OpenAI to summarize extracted text from files"""
     try:
         if len(text.strip()) < 10:
-            return "Extracted text is too short to summarize."
+            return TOO_SHORT_SUMMARY
 
         # Initialize OpenAI client with no proxies
         http_client = httpx.Client(proxies=None)
@@ -61,3 +74,39 @@ def summarize_extracted_text(text, max_len=150, min_len=30):
 
     except Exception as e:
         return f"Error generating summary from extracted text: {str(e)}. Please check your OpenAI API key and connection."
+
+
+def resolve_mode(mode=None):
+    """Requested summary mode, defaulting to OpenAI when a key is configured"""
+    if mode is None:
+        return 'llm' if os.getenv('OPENAI_API_KEY') else 'extractive'
+    return mode
+
+def summary_failed(result):
+    """True when summarization returned an error or placeholder message instead of a summary"""
+    summary = result["summary"]
+    return summary.startswith("Error generating summary") or summary == TOO_SHORT_SUMMARY
+
+def summarize_document(text, max_len=150, min_len=30, mode=None):
+    """
+    Summarize extracted text, trimming it to its most salient sentences first.
+
+    With an OpenAI key the reduced text goes to the completion API ("llm" mode);
+    without one, or when mode="extractive", the ranked sentences are the summary.
+    """
+    original_tokens = estimate_tokens(text)
+    mode = resolve_mode(mode)
+
+    if mode == 'extractive':
+        summary = extractive_summary(text, max_len=max_len) or TOO_SHORT_SUMMARY
+        reduced_tokens = 0
+    else:
+        reduced = reduce_text(text, LLM_INPUT_TOKEN_BUDGET)
+        reduced_tokens = estimate_tokens(reduced)
+        summary = summarize_extracted_text(reduced, max_len=max_len, min_len=min_len)
+
+    return {
+        "summary": summary,
+        "mode": mode,
+        "input_tokens": {"before": original_tokens, "after": reduced_tokens},
+    }
@@ -0,0 +1,98 @@
+import io
+import os
+import zipfile
+import threading
+from tempfile import SpooledTemporaryFile
+from flask import Request, current_app
+
+# Uploads up to this size are kept in memory; larger ones spill to an anonymous temp file
+DEFAULT_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+# Hard cap on the whole request body, enforced while the body is being read
+DEFAULT_MAX_CONTENT_LENGTH = 25 * 1024 * 1024
+
+
+def _env_megabytes(name, default_bytes):
+    value = os.getenv(name)
+    if not value:
+        return default_bytes
+    return int(float(value) * 1024 * 1024)
+
+
+def _config_default(app, key, value):
+    # Unlike config.setdefault, also fills keys Flask predefines as None (MAX_CONTENT_LENGTH)
+    if app.config.get(key) is None:
+        app.config[key] = value
+
+
+def configure_uploads(app):
+    """Install the spooling request class and upload size limits on the Flask app"""
+    app.request_class = SpooledUploadRequest
+    _config_default(app, "MAX_CONTENT_LENGTH",
+                    _env_megabytes("SUMMARIZER_MAX_UPLOAD_MB", DEFAULT_MAX_CONTENT_LENGTH))
+    _config_default(app, "UPLOAD_SPOOL_MAX_SIZE",
+                    _env_megabytes("SUMMARIZER_SPOOL_MB", DEFAULT_SPOOL_MAX_SIZE))
+
+
+class SpooledUploadRequest(Request):
+    """
+    Request that buffers multipart file parts in a SpooledTemporaryFile.
+
+    Werkzeug's default writes every upload above 500KB to disk. Here files stay
+    in memory up to UPLOAD_SPOOL_MAX_SIZE and only then roll over to an unlinked
+    temp file, which is unique per upload and removed when the request closes.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        max_size = current_app.config.get("UPLOAD_SPOOL_MAX_SIZE", DEFAULT_SPOOL_MAX_SIZE)
+        return SpooledTemporaryFile(max_size=max_size, mode="rb+")
+
+
+def upload_extension(filename):
+    """Lower-cased extension of an upload's filename, without the dot"""
+    if not filename or '.' not in filename:
+        return ''
+    return filename.rsplit('.', 1)[1].lower()
+
+
+def detach_upload_stream(file_storage):
+    """
+    Take ownership of an upload's spooled stream.
+
+    Flask closes request.files when the view returns, but a streamed response
+    keeps reading uploads after that; the caller must close the returned stream.
+    """
+    stream, file_storage.stream = file_storage.stream, io.BytesIO()
+    return stream
+
+
+def zip_documents(stream, archive_name, allowed_extensions, max_member_bytes, max_members=500):
+    """
+    List the documents in a zip upload as (name, read) pairs without reading them.
+
+    Members are read lazily (and one at a time, the archive handle is shared);
+    a member larger than max_member_bytes fails on read instead of being
+    inflated, which guards against zip bombs. Unsupported members are listed
+    with a reader that raises, so they surface as per-document errors.
+    """
+    archive = zipfile.ZipFile(stream)
+    lock = threading.Lock()
+    members = [info for info in archive.infolist()
+               if not info.is_dir() and not os.path.basename(info.filename).startswith('.')
+               and not info.filename.startswith('__MACOSX/')]
+    if len(members) > max_members:
+        raise ValueError(f"Archive has more than {max_members} files")
+
+    def reader(info):
+        def read():
+            if upload_extension(info.filename) not in allowed_extensions:
+                raise ValueError("Unsupported file type")
+            if info.file_size > max_member_bytes:
+                raise ValueError("File too large")
+            with lock, archive.open(info) as member:
+                data = member.read(max_member_bytes + 1)
+            if len(data) > max_member_bytes:
+                raise ValueError("File too large")
+            return data
+        return read
+
+    return [(f"{archive_name}/{info.filename}", reader(info)) for info in members]
@@ -0,0 +1,149 @@
+# asgi.py
+"""
+Production ASGI application: the anomaly FastAPI app and the Flask NLP/summarizer
+blueprints (summarizer_bp, nlp_bp) behind a single port.
+
+Requests whose path matches a Flask URL rule go to the Flask app through a WSGI
+bridge; everything else goes to FastAPI. Both share one lifespan, so startup and
+shutdown hooks registered with on_startup()/on_shutdown() run once per worker.
+
+Run it with backend/serve.py (preforked workers), or directly:
+  uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 4
+"""
+import os
+import sys
+import inspect
+import logging
+import importlib.util
+from contextlib import asynccontextmanager
+from typing import Callable, List
+
+from a2wsgi import WSGIMiddleware
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+from werkzeug.routing import RequestRedirect
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+FLASK_DIR = os.path.join(BACKEND_DIR, "app")
+
+# The Flask app imports routes/models/utils as top-level modules from its own directory
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+if FLASK_DIR not in sys.path:
+    sys.path.append(FLASK_DIR)
+
+from anomaly.app import app as anomaly_app  # noqa: E402
+
+log = logging.getLogger("asgi")
+
+_startup_hooks: List[Callable] = []
+_shutdown_hooks: List[Callable] = []
+
+
+def on_startup(fn: Callable) -> Callable:
+    """Register a (sync or async) hook run when each worker starts"""
+    _startup_hooks.append(fn)
+    return fn
+
+
+def on_shutdown(fn: Callable) -> Callable:
+    """Register a (sync or async) hook run when each worker stops, in reverse order"""
+    _shutdown_hooks.append(fn)
+    return fn
+
+
+async def _run_hook(fn: Callable):
+    result = fn()
+    if inspect.isawaitable(result):
+        await result
+
+
+def _load_flask_app():
+    # Load backend/app/app.py by path: `import app` would resolve to the backend/app package
+    spec = importlib.util.spec_from_file_location("nlp_flask_app", os.path.join(FLASK_DIR, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app
+
+
+@asynccontextmanager
+async def lifespan():
+    for hook in _startup_hooks:
+        await _run_hook(hook)
+    try:
+        async with anomaly_app.router.lifespan_context(anomaly_app):
+            yield
+    finally:
+        for hook in reversed(_shutdown_hooks):
+            try:
+                await _run_hook(hook)
+            except Exception:
+                log.exception("Shutdown hook %s failed", getattr(hook, "__name__", hook))
+
+
+class CombinedApp:
+    """Dispatches each HTTP request to the Flask or FastAPI app by URL rule"""
+
+    def __init__(self, flask_app, asgi_app, wsgi_threads: int = 10):
+        self.flask_app = flask_app
+        self.asgi_app = asgi_app
+        self.wsgi_app = WSGIMiddleware(flask_app, workers=wsgi_threads)
+        self._flask_urls = flask_app.url_map.bind("localhost")
+
+    def serves_flask(self, path: str, method: str) -> bool:
+        try:
+            self._flask_urls.match(path, method=method)
+        except (RequestRedirect, MethodNotAllowed):
+            # Let Flask answer its own redirects and 405s
+            return True
+        except NotFound:
+            return False
+        return True
+
+    async def _lifespan(self, receive, send):
+        await receive()  # lifespan.startup
+        started = False
+        try:
+            async with lifespan():
+                started = True
+                await send({"type": "lifespan.startup.complete"})
+                await receive()  # lifespan.shutdown
+        except Exception as e:
+            log.exception("Lifespan failed")
+            kind = "shutdown" if started else "startup"
+            await send({"type": f"lifespan.{kind}.failed", "message": str(e)})
+            return
+        await send({"type": "lifespan.shutdown.complete"})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http" and self.serves_flask(scope["path"], scope["method"]):
+            await self.wsgi_app(scope, receive, send)
+        else:
+            await self.asgi_app(scope, receive, send)
+
+
+@on_startup
+def _log_worker_start():
+    log.info("Worker %s serving Flask NLP + FastAPI anomaly apps", os.getpid())
+
+
+@on_startup
+def _preload_models():
+    # Load the enabled detectors (ANOMALY_DETECTORS) before accepting traffic instead of on the first request
+    if os.environ.get("SERVE_PRELOAD_MODELS", "0") != "1":
+        return
+    from anomaly.plugins import load_enabled
+    load_enabled()
+
+
+@on_shutdown
+def _log_worker_stop():
+    log.info("Worker %s shutting down", os.getpid())
+
+
+app = CombinedApp(
+    _load_flask_app(),
+    anomaly_app,
+    wsgi_threads=int(os.environ.get("SERVE_WSGI_THREADS", 10)),
+)
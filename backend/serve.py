@@ -0,0 +1,131 @@
+# serve.py
+"""
+Production launcher for asgi.py: one port, preforked worker processes.
+
+  python serve.py --workers 4 --port 8000
+
+Uses gunicorn's preforking master with uvicorn workers where gunicorn is
+available (Linux/macOS) and falls back to uvicorn's multi-process supervisor
+otherwise. Every option can also be set through SERVE_* environment variables.
+"""
+import os
+import sys
+import argparse
+import logging
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+log = logging.getLogger("serve")
+
+
+def default_workers() -> int:
+    # Each worker holds its own copy of the detector models, so stay conservative
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Serve the NLP and anomaly apps on one port")
+    p.add_argument("--host", default=os.environ.get("SERVE_HOST", "0.0.0.0"))
+    p.add_argument("--port", type=int, default=int(os.environ.get("SERVE_PORT", 8000)))
+    p.add_argument("--workers", type=int, default=int(os.environ.get("SERVE_WORKERS", default_workers())))
+    p.add_argument("--timeout", type=int, default=int(os.environ.get("SERVE_TIMEOUT", 300)),
+                   help="seconds before a silent worker is restarted (videos can be slow)")
+    p.add_argument("--max-requests", type=int, default=int(os.environ.get("SERVE_MAX_REQUESTS", 1000)),
+                   help="recycle a worker after this many requests (0 disables)")
+    p.add_argument("--log-level", default=os.environ.get("SERVE_LOG_LEVEL", "info"))
+    return p.parse_args(argv)
+
+
+def run_gunicorn(args) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class StandaloneApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from asgi import app
+            return app
+
+    # CPU slots for the thread governor's pinning, owned by the master: a worker
+    # takes the lowest free one before it is forked and returns it when it exits,
+    # so a recycled worker's replacement gets the freed slot, never a live one
+    free_slots = set(range(args.workers))
+
+    def pre_fork(server, worker):
+        worker.governor_slot = min(free_slots) if free_slots else None
+        free_slots.discard(worker.governor_slot)
+
+    def post_fork(server, worker):
+        if worker.governor_slot is None:
+            # More workers than slots (e.g. after TTIN): run unpinned
+            os.environ.pop("GOVERNOR_WORKER_SLOT", None)
+        else:
+            os.environ["GOVERNOR_WORKER_SLOT"] = str(worker.governor_slot)
+
+    def child_exit(server, worker):
+        if getattr(worker, "governor_slot", None) is not None:
+            free_slots.add(worker.governor_slot)
+
+    StandaloneApplication({
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": "uvicorn_worker.UvicornWorker",
+        "timeout": args.timeout,
+        "graceful_timeout": 30,
+        "keepalive": 5,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests // 10,
+        "loglevel": args.log_level,
+        # Import the app in each worker after fork: torch/onnxruntime thread pools are not fork-safe
+        "preload_app": False,
+        "chdir": BACKEND_DIR,
+        "pre_fork": pre_fork,
+        "post_fork": post_fork,
+        "child_exit": child_exit,
+    }).run()
+
+
+def run_uvicorn(args) -> None:
+    import uvicorn
+    # uvicorn's supervisor has no fork hooks to hand out GOVERNOR_WORKER_SLOT,
+    # so the governor can't give workers distinct CPU slices here
+    if os.environ.get("GOVERNOR_PIN") == "1" and args.workers > 1:
+        log.warning("GOVERNOR_PIN needs gunicorn to assign worker slots; workers will run unpinned")
+    uvicorn.run(
+        "asgi:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        app_dir=BACKEND_DIR,
+        timeout_keep_alive=5,
+        limit_max_requests=args.max_requests or None,
+        log_level=args.log_level,
+    )
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper())
+    # Workers read this to split the CPUs between them (anomaly/governor.py)
+    os.environ["SERVE_WORKERS"] = str(args.workers)
+    try:
+        import gunicorn  # noqa: F401
+        use_gunicorn = sys.platform != "win32"
+    except ImportError:
+        use_gunicorn = False
+    log.info("Serving on %s:%s with %d workers (%s)", args.host, args.port, args.workers,
+             "gunicorn" if use_gunicorn else "uvicorn")
+    if use_gunicorn:
+        run_gunicorn(args)
+    else:
+        run_uvicorn(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ const fs = require('fs');
 const axios = require('axios');
 const multer = require('multer');
 const FormData = require('form-data');
+const jwt = require('jsonwebtoken');
 require('dotenv').config();
 
 const connectDB = require('./config/database');
@@ -159,12 +160,46 @@ const storage = multer.diskStorage({
 });
 const upload = multer({ storage });
 
+// Helper: Admission priority for the FastAPI anomaly service (see anomaly/admission.py).
+// Police submissions are urgent; any caller may downgrade itself to bulk.
+async function anomalyPriority(req) {
+  if (req.body && req.body.priority === 'bulk') return 'bulk';
+  const token = req.header('Authorization')?.replace('Bearer ', '');
+  if (!token) return 'normal';
+  try {
+    const decoded = jwt.verify(token, process.env.JWT_SECRET || 'fallback_secret');
+    const User = require('./models/User');
+    const user = await User.findById(decoded.id).select('role isActive');
+    if (user && user.isActive && user.role === 'police') return 'urgent';
+  } catch (e) {
+    // invalid token: forward as an ordinary request
+  }
+  return 'normal';
+}
+
+// Helper: Pass FastAPI load shedding (503 + Retry-After, or 413) to the client instead of retrying
+function relayAdmissionRejection(err, res) {
+  const resp = err && err.response;
+  if (!resp || (resp.status !== 503 && resp.status !== 413)) return false;
+  const retryAfter = resp.headers['retry-after'];
+  if (retryAfter) res.setHeader('Retry-After', retryAfter);
+  res.status(resp.status).json({
+    error: resp.status === 503 ? 'Anomaly service is busy, please retry later' : 'File too large for the anomaly service',
+    retryAfter: retryAfter ? Number(retryAfter) : undefined
+  });
+  return true;
+}
+
 // Helper: Forward file to FastAPI endpoint
-async function forwardFileToFastAPI(fastapiUrl, filePath, originalName) {
+async function forwardFileToFastAPI(fastapiUrl, filePath, originalName, priority = 'normal') {
   const form = new FormData();
-  form.append('file', fs.createReadStream(filePath), { filename: originalName });
+  const { size } = fs.statSync(filePath);
+  form.append('file', fs.createReadStream(filePath), { filename: originalName, knownLength: size });
 
-  const headers = form.getHeaders();
+  // Content-Length lets the anomaly service admit or shed the request before reading the body
+  const headers = { ...form.getHeaders(), 'Content-Length': form.getLengthSync(), 'X-Priority': priority };
+  // Lets the anomaly service trust X-Priority when it is not on this host (ADMISSION_PROXY_SECRET)
+  if (process.env.ANOMALY_PROXY_SECRET) headers['X-Proxy-Secret'] = process.env.ANOMALY_PROXY_SECRET;
   const resp = await axios.post(fastapiUrl, form, {
     headers,
     responseType: 'stream',
@@ -201,7 +236,8 @@ app.post('/api/anomaly/upload', upload.single('file'), async (req, res) => {
     }
 
     console.log('Forwarding upload to FastAPI /predict:', req.file.path);
-    const fastResp = await forwardFileToFastAPI(target, req.file.path, req.file.originalname);
+    const priority = await anomalyPriority(req);
+    const fastResp = await forwardFileToFastAPI(target, req.file.path, req.file.originalname, priority);
 
     const contentType = (fastResp.headers['content-type'] || '').toLowerCase();
     if (contentType.includes('application/json') || contentType.includes('text/')) {
@@ -219,6 +255,7 @@ app.post('/api/anomaly/upload', upload.single('file'), async (req, res) => {
       streamAxiosResponseToExpress(fastResp, res);
     }
   } catch (err) {
+    if (relayAdmissionRejection(err, res)) return;
     console.error('Error forwarding /api/anomaly/upload:', err.message || err);
     res.status(500).json({ error: err.message || String(err) });
   } finally {
@@ -242,11 +279,12 @@ app.post('/api/anomaly/weapon', upload.single('file'), async (req, res) => {
       `${fastapi.replace(/\/$/, '')}/predict`
     ];
     
+    const priority = await anomalyPriority(req);
     let lastErr = null;
     for (const target of candidates) {
       try {
         console.log(`Proxying /api/anomaly/weapon -> ${target}`);
-        const fastResp = await forwardFileToFastAPI(target, req.file.path, req.file.originalname);
+        const fastResp = await forwardFileToFastAPI(target, req.file.path, req.file.originalname, priority);
 
         const ct = (fastResp.headers['content-type'] || '').toLowerCase();
         if (ct.includes('application/json') || ct.includes('text/')) {
@@ -266,6 +304,7 @@ app.post('/api/anomaly/weapon', upload.single('file'), async (req, res) => {
           return;
         }
       } catch (err) {
+        if (relayAdmissionRejection(err, res)) return;
         console.warn('Forward attempt failed for', target, err.message || err);
         lastErr = err;
       }
@@ -297,11 +336,12 @@ app.post('/api/anomaly/shoplifting', upload.single('file'), async (req, res) =>
       `${fastapi.replace(/\/$/, '')}/predict`
     ];
     
+    const priority = await anomalyPriority(req);
     let lastErr = null;
     for (const target of candidates) {
       try {
         console.log(`Proxying /api/anomaly/shoplifting -> ${target}`);
-        const fastResp = await forwardFileToFastAPI(target, req.file.path, req.file.originalname);
+        const fastResp = await forwardFileToFastAPI(target, req.file.path, req.file.originalname, priority);
 
         const ct = (fastResp.headers['content-type'] || '').toLowerCase();
         if (ct.includes('application/json') || ct.includes('text/')) {
@@ -321,6 +361,7 @@ app.post('/api/anomaly/shoplifting', upload.single('file'), async (req, res) =>
           return;
         }
       } catch (err) {
+        if (relayAdmissionRejection(err, res)) return;
         console.warn('Forward attempt failed for', target, err.message || err);
         lastErr = err;
       }
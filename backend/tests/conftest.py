@@ -0,0 +1,41 @@
+# conftest.py
+"""
+Test setup shared by the Flask app (backend/app) and the anomaly package.
+
+Mirrors asgi.py: backend/ is importable for the anomaly package and backend/app
+is appended for the Flask app's top-level routes/models/utils imports. Stores
+the app would write to (search index, near-duplicate store, translation memory)
+are pointed at a per-session temp directory.
+"""
+import os
+import sys
+import tempfile
+import importlib.util
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FLASK_DIR = os.path.join(BACKEND_DIR, "app")
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+if FLASK_DIR not in sys.path:
+    sys.path.append(FLASK_DIR)
+
+_STORE_DIR = tempfile.mkdtemp(prefix="justicechain-tests-")
+os.environ.setdefault("SEARCH_INDEX_DIR", os.path.join(_STORE_DIR, "search_index"))
+os.environ.setdefault("NEAR_DUPLICATE_STORE", os.path.join(_STORE_DIR, "near_duplicates.jsonl"))
+os.environ.setdefault("TRANSLATION_MEMORY_PATH", os.path.join(_STORE_DIR, "translation_memory.jsonl"))
+# Tests must never call the OpenAI API; an empty value also stops load_dotenv filling it from .env
+os.environ["OPENAI_API_KEY"] = ""
+
+
+@pytest.fixture
+def flask_app():
+    """A fresh Flask app from backend/app/app.py (loaded by path, as asgi.py does)"""
+    spec = importlib.util.spec_from_file_location("nlp_flask_app", os.path.join(FLASK_DIR, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    app = module.create_app()
+    app.config["TESTING"] = True
+    return app
@@ -0,0 +1,189 @@
+import asyncio
+import json
+
+import pytest
+
+from anomaly.admission import AdmissionController, AdmissionMiddleware, Rejected, parse_priority
+
+MB = 2 ** 20
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("urgent", "urgent"), (" Police ", "urgent"), ("high", "urgent"), ("batch", "bulk"),
+    ("low", "bulk"), ("normal", "normal"), ("", "normal"), (None, "normal"), ("vip", "normal"),
+])
+def test_parse_priority(value, expected):
+    assert parse_priority(value) == expected
+
+
+def test_urgent_slot_is_reserved():
+    async def scenario():
+        ctl = AdmissionController(max_concurrent=2, urgent_slots=1)
+        normal = ctl.admit("normal", MB)
+        waiting = ctl.admit("normal", MB)
+        urgent = ctl.admit("urgent", MB)
+        # One shared slot for normal work; the reserved one goes to urgent
+        assert normal.future.done() and urgent.future.done()
+        assert not waiting.future.done()
+        ctl.release(urgent)
+        assert not waiting.future.done()
+        ctl.release(normal)
+        assert waiting.future.done()
+        assert ctl.stats["urgent"]["completed"] == 1
+    run(scenario())
+
+
+def test_dispatch_is_strict_priority():
+    async def scenario():
+        ctl = AdmissionController(max_concurrent=1, urgent_slots=0)
+        running = ctl.admit("bulk", MB)
+        bulk = ctl.admit("bulk", MB)
+        normal = ctl.admit("normal", MB)
+        ctl.release(running)
+        assert normal.future.done() and not bulk.future.done()
+    run(scenario())
+
+
+def test_full_queue_is_shed_with_retry_after():
+    async def scenario():
+        ctl = AdmissionController(max_concurrent=1, urgent_slots=0, queue_depth={"bulk": 1})
+        ctl.admit("bulk", MB)
+        ctl.admit("bulk", MB)
+        with pytest.raises(Rejected) as err:
+            ctl.admit("bulk", MB)
+        assert err.value.status == 503
+        assert 1 <= err.value.retry_after <= 300
+        assert ctl.stats["bulk"]["rejected"] == 1
+    run(scenario())
+
+
+def test_byte_budget_keeps_headroom_for_urgent():
+    async def scenario():
+        ctl = AdmissionController(max_concurrent=4, urgent_slots=1, max_inflight_bytes=100 * MB,
+                                  shared_bytes_fraction=0.8)
+        ctl.admit("normal", 70 * MB)
+        with pytest.raises(Rejected, match="bytes in flight"):
+            ctl.admit("normal", 20 * MB)
+        ctl.admit("urgent", 20 * MB)
+        assert ctl.inflight_bytes == 90 * MB
+        with pytest.raises(Rejected) as err:
+            ctl.admit("urgent", 101 * MB)
+        assert err.value.status == 413 and err.value.retry_after is None
+    run(scenario())
+
+
+def test_queue_timeout_frees_the_ticket():
+    async def scenario():
+        ctl = AdmissionController(max_concurrent=1, urgent_slots=0, queue_timeout=0.05)
+        running = ctl.admit("normal", MB)
+        queued = ctl.admit("normal", 2 * MB)
+        with pytest.raises(Rejected, match="Timed out"):
+            await ctl.wait(queued)
+        assert ctl.stats["normal"]["timed_out"] == 1
+        assert len(ctl.queues["normal"]) == 0
+        assert ctl.inflight_bytes == MB
+        ctl.release(running)
+        assert ctl.inflight_bytes == 0
+    run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        ctl = AdmissionController(max_concurrent=1, urgent_slots=0)
+        running = ctl.admit("normal", MB)
+        queued = ctl.admit("normal", MB)
+        task = asyncio.ensure_future(ctl.wait(queued))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        ctl.release(running)
+        assert ctl.running == [] and ctl.inflight_bytes == 0
+    run(scenario())
+
+
+def test_cost_model_learns_from_completed_requests():
+    async def scenario():
+        ctl = AdmissionController()
+        before = ctl.estimate_seconds(100 * MB)
+        ticket = ctl.admit("normal", 100 * MB)
+        ticket.started -= 60  # pretend inference took a minute
+        ctl.release(ticket)
+        assert ctl.estimate_seconds(100 * MB) > before
+    run(scenario())
+
+
+async def call(middleware, headers=(), client=("10.0.0.5", 1234), body=b"x" * 10):
+    sent = []
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/predict", "client": client,
+             "headers": [(k.encode(), v.encode()) for k, v in
+                         [("content-length", str(len(body))), *headers]]}
+    await middleware(scope, receive, send)
+    return sent
+
+
+def make_middleware(controller, seen=None, **kwargs):
+    async def app(scope, receive, send):
+        if seen is not None:
+            seen.append(controller.running[-1].priority)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return AdmissionMiddleware(app, controller=controller, trusted_proxies="127.0.0.1,10.1.0.0/16",
+                               proxy_secret="s3cret", **kwargs)
+
+
+@pytest.mark.parametrize("client, headers, expected", [
+    (("10.0.0.5", 1), [("x-priority", "urgent")], "normal"),
+    (("127.0.0.1", 1), [("x-priority", "urgent")], "urgent"),
+    (("10.1.2.3", 1), [("x-priority", "urgent")], "urgent"),
+    (("10.0.0.5", 1), [("x-priority", "urgent"), ("x-proxy-secret", "s3cret")], "urgent"),
+    (("127.0.0.1", 1), [("x-priority", "urgent"), ("x-proxy-secret", "wrong")], "normal"),
+    (("10.0.0.5", 1), [("x-priority", "bulk")], "bulk"),
+])
+def test_only_trusted_proxies_may_request_urgent(client, headers, expected):
+    seen = []
+    ctl = AdmissionController()
+    sent = run(call(make_middleware(ctl, seen), headers, client))
+    assert sent[0]["status"] == 200
+    assert seen == [expected]
+    assert ctl.running == []
+
+
+def test_shed_request_gets_503_with_retry_after():
+    async def scenario():
+        ctl = AdmissionController(max_concurrent=1, urgent_slots=0, queue_depth={"normal": 0})
+        return ctl, await call(make_middleware(ctl))
+    ctl, sent = run(scenario())
+    start, body = sent
+    headers = dict(start["headers"])
+    assert start["status"] == 503
+    assert int(headers[b"retry-after"]) >= 1
+    assert headers[b"connection"] == b"close"
+    assert json.loads(body["body"])["detail"] == "normal queue is full"
+    assert ctl.stats["normal"]["rejected"] == 1
+
+
+def test_oversized_request_gets_413_without_retry_after():
+    ctl = AdmissionController(max_inflight_bytes=5)
+    start, _ = run(call(make_middleware(ctl)))
+    assert start["status"] == 413
+    assert b"retry-after" not in dict(start["headers"])
+
+
+def test_disabled_or_unguarded_requests_pass_through(monkeypatch):
+    ctl = AdmissionController(max_inflight_bytes=5)
+    monkeypatch.setenv("ADMISSION", "0")
+    assert run(call(make_middleware(ctl)))[0]["status"] == 200
+    assert ctl.stats["normal"]["admitted"] == 0
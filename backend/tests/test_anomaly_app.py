@@ -0,0 +1,78 @@
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from anomaly import app as anomaly_app
+
+
+def png(value):
+    ok, data = cv2.imencode(".png", np.full((8, 8, 3), value, dtype=np.uint8))
+    assert ok
+    return data.tobytes()
+
+
+class FakeYolo:
+    """Stands in for detect_yolo: records how many images each call received"""
+
+    BATCH_SIZE = 2
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_images(self, images, conf=0.25, batch_size=BATCH_SIZE):
+        self.calls.append((len(images), batch_size))
+        detections = [[{"confidence": float(img[0, 0, 0]) / 255}] for img in images]
+        errors = ["model crashed" if img[0, 0, 0] == 13 else None for img in images]
+        return {"model_loaded": True, "model_path": "fake.pt", "detections": detections, "errors": errors}
+
+
+@pytest.fixture
+def yolo(monkeypatch):
+    fake = FakeYolo()
+
+    class Plugin:
+        def load(self):
+            return fake
+
+    monkeypatch.setattr(anomaly_app, "_detector", lambda name: Plugin())
+    monkeypatch.setenv("ADMISSION", "0")
+    return fake
+
+
+def post_batch(files, **form):
+    client = TestClient(anomaly_app.app)
+    return client.post("/predict/shoplifting/batch", data=form,
+                       files=[("files", (name, data, "image/png")) for name, data in files])
+
+
+def test_batch_is_read_and_run_one_model_batch_at_a_time(yolo):
+    files = [("a.png", png(51)), ("bad.png", b"not an image"), ("c.png", png(13)),
+             ("d.png", png(102)), ("e.png", png(204))]
+    response = post_batch(files)
+    assert response.status_code == 200
+    body = response.json()
+    # Chunks of BATCH_SIZE uploads; the undecodable one never reaches the model
+    assert yolo.calls == [(1, 2), (2, 2), (1, 2)]
+    results = body["results"]
+    assert [r["filename"] for r in results] == [name for name, _ in files]
+    assert results[0]["detections"][0]["confidence"] == pytest.approx(0.2)
+    assert results[1]["error"] == "Could not decode image"
+    assert results[2]["error"] == "Detection failed: model crashed"
+    assert "error" not in results[3] and "error" not in results[4]
+    assert body["images"] == 5
+
+
+def test_client_batch_size_cannot_exceed_configured_batch(yolo):
+    post_batch([(f"{i}.png", png(i)) for i in range(4)], batch_size="64")
+    assert yolo.calls == [(2, 2), (2, 2)]
+    yolo.calls.clear()
+    post_batch([(f"{i}.png", png(i)) for i in range(3)], batch_size="1")
+    assert yolo.calls == [(1, 1)] * 3
+
+
+def test_too_many_images_is_413(yolo, monkeypatch):
+    monkeypatch.setattr(anomaly_app, "BATCH_MAX_IMAGES", 2)
+    response = post_batch([(f"{i}.png", png(i)) for i in range(3)])
+    assert response.status_code == 413
+    assert yolo.calls == []
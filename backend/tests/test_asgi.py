@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("torch", "onnxruntime", "cv2", "ultralytics", "transformers")
+
+
+def test_import_stays_free_of_model_frameworks():
+    # A fresh interpreter: other tests in this session may have imported cv2 already
+    code = ("import sys, asgi; "
+            f"print('loaded:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True,
+                            text=True, timeout=120, env={**os.environ, "OPENAI_API_KEY": ""})
+    assert result.returncode == 0, result.stderr
+    # app.py may print a missing-key warning first; the report is the last line
+    assert result.stdout.strip().splitlines()[-1] == "loaded:"
+
+
+@pytest.fixture(scope="module")
+def combined():
+    import asgi
+    return asgi.app
+
+
+@pytest.mark.parametrize("path, method, flask", [
+    ("/summarize", "POST", True),
+    ("/translate/stats", "GET", True),
+    # Wrong method on a Flask rule: Flask answers its own 405
+    ("/translate", "GET", True),
+    ("/detectors", "GET", False),
+    ("/predict/weapon", "POST", False),
+    ("/", "GET", False),
+    ("/no-such-route", "GET", False),
+])
+def test_serves_flask_by_url_rule(combined, path, method, flask):
+    assert combined.serves_flask(path, method) is flask
+
+
+def test_requests_reach_the_right_app(combined):
+    from fastapi.testclient import TestClient
+    with TestClient(combined) as client:
+        stats = client.get("/translate/stats")
+        assert stats.status_code == 200
+        assert "memory_entries" in stats.json()
+
+        assert client.get("/translate").status_code == 405
+
+        detectors = client.get("/detectors")
+        assert detectors.status_code == 200
+        assert "detectors" in detectors.json()
+
+        assert client.get("/no-such-route").json() == {"detail": "Not Found"}
@@ -0,0 +1,91 @@
+import io
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from utils.audio_stream import open_pcm_stream
+
+
+class TrickleStream(io.BytesIO):
+    """Non-seekable body that returns at most `step` bytes per read, like a socket"""
+
+    def __init__(self, data, step=7):
+        super().__init__(data)
+        self.step = step
+
+    def read(self, n=-1):
+        return super().read(self.step if n is None or n < 0 else min(n, self.step))
+
+    def seekable(self):
+        return False
+
+
+def wav_bytes(samples, sample_rate=16000, channels=1, width=2):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(width)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+    return buf.getvalue()
+
+
+def float_wav_bytes(samples, sample_rate=16000, data_size=None):
+    """IEEE float WAV with an extra chunk before data, optionally with a placeholder size"""
+    data = samples.astype("<f4").tobytes()
+    fmt = struct.pack("<HHIIHH", 3, 1, sample_rate, sample_rate * 4, 4, 32)
+    size = len(data) if data_size is None else data_size
+    body = (b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+            + b"LIST" + struct.pack("<I", 3) + b"abc\x00"
+            + b"data" + struct.pack("<I", size) + data)
+    return b"RIFF" + struct.pack("<I", 4 + len(body)) + body
+
+
+def read_all(stream, chunk_bytes=1024):
+    rate, chunks = open_pcm_stream(stream, chunk_bytes=chunk_bytes)
+    return rate, np.concatenate(list(chunks))
+
+
+def test_int16_wav_round_trips_through_small_chunks():
+    samples = (np.sin(np.linspace(0, 20, 5001)) * 20000).astype("<i2")
+    # An odd chunk size splits frames, which must be carried to the next chunk
+    rate, decoded = read_all(TrickleStream(wav_bytes(samples, 22050)), chunk_bytes=333)
+    assert rate == 22050
+    assert len(decoded) == len(samples)
+    np.testing.assert_allclose(decoded, samples / 32768.0, atol=1e-6)
+
+
+def test_stereo_is_downmixed():
+    left = np.full(100, 10000, dtype="<i2")
+    right = np.full(100, -2000, dtype="<i2")
+    interleaved = np.stack([left, right], axis=1).ravel()
+    _, decoded = read_all(io.BytesIO(wav_bytes(interleaved, channels=2)))
+    assert len(decoded) == 100
+    np.testing.assert_allclose(decoded, 4000 / 32768.0, atol=1e-6)
+
+
+def test_uint8_wav():
+    samples = np.array([0, 128, 255], dtype=np.uint8)
+    _, decoded = read_all(io.BytesIO(wav_bytes(samples, width=1)))
+    np.testing.assert_allclose(decoded, [-1.0, 0.0, 127 / 128], atol=1e-6)
+
+
+@pytest.mark.parametrize("data_size", [None, 0, 0xFFFFFFFF])
+def test_float_wav_skips_unknown_chunks_and_streams_to_eof(data_size):
+    samples = np.linspace(-1, 1, 257, dtype=np.float32)
+    rate, decoded = read_all(TrickleStream(float_wav_bytes(samples, 8000, data_size)))
+    assert rate == 8000
+    np.testing.assert_allclose(decoded, samples)
+
+
+def test_wav_without_data_chunk_is_rejected():
+    header = b"RIFF" + struct.pack("<I", 4) + b"WAVE"
+    with pytest.raises(ValueError, match="no data chunk"):
+        open_pcm_stream(io.BytesIO(header))
+
+
+def test_empty_body_is_rejected():
+    with pytest.raises(ValueError, match="No audio"):
+        open_pcm_stream(io.BytesIO(b""))
@@ -0,0 +1,84 @@
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils import document_pipeline
+from utils.document_pipeline import summarize_batch
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Extract in-process and summarize without the indexes or a model"""
+    extract_pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(document_pipeline, "get_extract_pool", lambda: extract_pool)
+    monkeypatch.setattr(document_pipeline, "extract_text_from_bytes",
+                        lambda filename, data: data.decode("utf-8"))
+
+    def process_document(text, filename, mode=None):
+        if text == "boom":
+            raise RuntimeError("model crashed")
+        return {"summary": f"summary of {text}", "mode": mode or "extractive"}
+
+    monkeypatch.setattr(document_pipeline, "process_document", process_document)
+    yield
+    extract_pool.shutdown()
+
+
+def reader(data):
+    return lambda: data
+
+
+def test_one_line_per_document_then_done(pipeline):
+    documents = [("a.pdf", reader(b"first")), ("b.pdf", reader(b"second"))]
+    lines = list(summarize_batch(documents, mode="extractive"))
+    done = lines.pop()
+    assert sorted(line["index"] for line in lines) == [0, 1]
+    assert {line["filename"]: line["summary"] for line in lines} == {
+        "a.pdf": "summary of first", "b.pdf": "summary of second"}
+    assert all(line["status"] == "ok" and line["elapsed_ms"] >= 0 for line in lines)
+    assert done["done"] is True
+    assert (done["documents"], done["succeeded"], done["failed"]) == (2, 2, 0)
+
+
+def test_failures_become_error_lines(pipeline):
+    def unreadable():
+        raise ValueError("File too large")
+
+    documents = [
+        ("good.pdf", reader(b"fine")),
+        ("big.pdf", unreadable),
+        ("blank.pdf", reader(b"   ")),
+        ("crash.pdf", reader(b"boom")),
+        ("scan.pdf", reader(b"Error extracting text: bad xref")),
+    ]
+    lines = {line.get("filename"): line for line in summarize_batch(documents)}
+    assert lines["good.pdf"]["status"] == "ok"
+    assert lines["big.pdf"]["error"] == "File too large"
+    assert lines["blank.pdf"]["error"] == "No text could be extracted"
+    assert lines["crash.pdf"]["error"] == "model crashed"
+    assert lines["scan.pdf"]["error"].startswith("Error extracting")
+    assert (lines[None]["succeeded"], lines[None]["failed"]) == (1, 4)
+
+
+def test_failed_summary_is_an_error_line(pipeline, monkeypatch):
+    monkeypatch.setattr(document_pipeline, "process_document",
+                        lambda text, filename, mode=None: {"summary": "Error generating summary: 429"})
+    line = next(summarize_batch([("a.pdf", reader(b"text"))]))
+    assert line["status"] == "error"
+    assert line["error"] == "Error generating summary: 429"
+
+
+def test_batch_route_streams_ndjson(flask_app, pipeline):
+    response = flask_app.test_client().post("/summarize-batch", data={
+        "files": [(io.BytesIO(b"one"), "a.pdf"), (io.BytesIO(b"two"), "notes.txt")],
+        "mode": "extractive",
+    })
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    by_name = {line.get("filename"): line for line in lines}
+    assert by_name["a.pdf"]["summary"] == "summary of one"
+    assert by_name["notes.txt"]["error"] == "Unsupported file type"
+    assert lines[-1]["done"] is True
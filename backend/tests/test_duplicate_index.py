@@ -0,0 +1,128 @@
+import json
+import threading
+
+import pytest
+
+from models import duplicate_index
+from models.duplicate_index import DuplicateIndex
+from utils import document_pipeline
+from utils.file_handler import TOO_SHORT_SUMMARY
+
+JUDGMENT = ("The appellant was convicted under section 302 for the murder of his neighbour after a "
+            "dispute over the boundary wall, and the High Court confirmed the conviction on appeal. "
+            "The only eyewitness was the deceased's wife, whose testimony remained consistent.")
+OTHER = ("The landlord sought eviction of the tenant for non-payment of rent for eleven months, "
+         "and the rent controller allowed the petition after the tenant failed to deposit arrears.")
+
+
+def result(summary, mode="extractive"):
+    return {"summary": summary, "mode": mode}
+
+
+def test_lookup_finds_near_duplicate_in_same_mode_only():
+    index = DuplicateIndex(None, threshold=0.6)
+    key = index.add(index.signature(JUDGMENT), result("S1"), filename="a.pdf")
+    rescan = index.signature(JUDGMENT.replace("consistent", "consistent throughout"))
+
+    match = index.lookup(rescan, mode="extractive")
+    assert match["key"] == key
+    assert match["result"]["summary"] == "S1"
+    assert 0.6 <= match["similarity"] <= 1.0
+    assert index.lookup(rescan, mode="llm") is None
+    assert index.lookup(index.signature(OTHER)) is None
+
+
+def test_keys_are_opaque():
+    index = DuplicateIndex(None)
+    key = index.add(index.signature(JUDGMENT), result("S1"), filename="secret-client.pdf")
+    assert len(key) == 32 and "secret" not in key
+
+
+def test_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "dups.jsonl")
+    writer = DuplicateIndex(path)
+    reader = DuplicateIndex(path)
+    writer.add(writer.signature(JUDGMENT), result("S1"))
+    # The reader tails the file on lookup, as another worker process would
+    assert reader.lookup(reader.signature(JUDGMENT))["result"]["summary"] == "S1"
+    assert len(DuplicateIndex(path)) == 1
+
+
+def test_partial_trailing_line_is_left_for_later(tmp_path):
+    path = tmp_path / "dups.jsonl"
+    index = DuplicateIndex(str(path))
+    index.add(index.signature(JUDGMENT), result("S1"))
+    with open(path, "ab") as fh:
+        fh.write(b'{"key": "half-writ')
+    assert len(DuplicateIndex(str(path))) == 1
+
+
+def test_store_is_compacted_to_newest_entries(tmp_path):
+    path = tmp_path / "dups.jsonl"
+    index = DuplicateIndex(str(path), max_entries=4)
+    other = DuplicateIndex(str(path), max_entries=4)
+    keys = [index.add(index.signature(f"{JUDGMENT} Case number {i}."), result(f"S{i}")) for i in range(6)]
+
+    # 6 > 4 * 1.25 triggers a rewrite down to the newest 4
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["key"] for line in lines] == keys[2:]
+    assert len(index) == 4
+    # Another process holding the old offset notices the replaced file and reloads it
+    other._refresh()
+    assert set(other._entries) == set(keys[2:])
+    assert index.lookup(index.signature(f"{JUDGMENT} Case number 0."), mode="extractive")["key"] != keys[0]
+
+
+def test_concurrent_adds_keep_every_line(tmp_path):
+    path = tmp_path / "dups.jsonl"
+    index = DuplicateIndex(str(path))
+    threads = [threading.Thread(target=index.add, args=(index.signature(f"{OTHER} {i}"), result(str(i))))
+               for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 8
+    assert len(DuplicateIndex(str(path))) == 8
+
+
+def test_get_duplicate_index_creates_one_instance(monkeypatch, tmp_path):
+    monkeypatch.setattr(duplicate_index, "_index", None)
+    monkeypatch.setenv("NEAR_DUPLICATE_STORE", str(tmp_path / "dups.jsonl"))
+    monkeypatch.setenv("NEAR_DUPLICATE_MAX_ENTRIES", "10")
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(duplicate_index.get_duplicate_index()))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(index) for index in seen}) == 1
+    assert seen[0].max_entries == 10
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    index = DuplicateIndex(None)
+    monkeypatch.setattr(document_pipeline, "get_duplicate_index", lambda: index)
+    monkeypatch.setattr(document_pipeline, "index_document", lambda text, filename: None)
+    return index
+
+
+def test_process_document_returns_opaque_id_not_filename(pipeline, monkeypatch):
+    monkeypatch.setattr(document_pipeline, "summarize_document", lambda text, mode=None: result("S1", mode))
+    first = document_pipeline.process_document(JUDGMENT, "client-x.pdf", mode="extractive")
+    assert "near_duplicate" not in first
+
+    second = document_pipeline.process_document(JUDGMENT, "mine.pdf", mode="extractive")
+    flagged = second["near_duplicate"]
+    assert second["summary"] == "S1"
+    assert flagged["id"] in pipeline._entries
+    assert "client-x.pdf" not in json.dumps(second)
+
+
+@pytest.mark.parametrize("summary", [TOO_SHORT_SUMMARY, "Error generating summary: timeout"])
+def test_failed_summaries_are_not_remembered(pipeline, monkeypatch, summary):
+    monkeypatch.setattr(document_pipeline, "summarize_document", lambda text, mode=None: result(summary, mode))
+    document_pipeline.process_document(JUDGMENT, "a.pdf", mode="extractive")
+    assert len(pipeline) == 0
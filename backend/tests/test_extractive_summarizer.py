@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from models.extractive_summarizer import (
+    estimate_tokens, extractive_summary, reduce_text, select_sentences,
+    split_sentences, textrank_scores, tfidf_matrix,
+)
+
+
+def test_split_sentences_keeps_legal_abbreviations():
+    text = ("The appellant relied on Sec. 420 of the Code. The respondent cited State v. Kumar. "
+            "Arguments closed.")
+    assert split_sentences(text) == [
+        "The appellant relied on Sec. 420 of the Code.",
+        "The respondent cited State v. Kumar.",
+        "Arguments closed.",
+    ]
+
+
+def test_split_sentences_empty():
+    assert split_sentences("") == []
+    assert split_sentences("   \n ") == []
+
+
+def test_tfidf_rows_are_unit_length_and_ignore_stopwords():
+    matrix = tfidf_matrix(["The court dismissed the appeal.", "The appeal was heard.", "of the and"])
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    assert norms[:2] == pytest.approx([1.0, 1.0])
+    # A sentence made only of stopwords has no terms
+    assert matrix[2].nnz == 0
+
+
+def test_tfidf_empty_vocabulary():
+    matrix = tfidf_matrix(["a the of", "and"])
+    assert matrix.shape == (2, 0)
+
+
+def test_textrank_favours_central_sentence():
+    sentences = [
+        "The police recovered the stolen phone from the accused.",
+        "The stolen phone belonged to the complainant.",
+        "The accused was arrested near the market.",
+        "Rain fell heavily that evening.",
+    ]
+    scores = textrank_scores(tfidf_matrix(sentences))
+    assert scores.sum() == pytest.approx(1.0)
+    assert int(np.argmax(scores)) == 0
+    assert int(np.argmin(scores)) == 3
+
+
+def test_select_sentences_respects_budget_and_document_order():
+    sentences = [f"Sentence {i} mentions evidence item {i} and witness {i}." for i in range(10)]
+    text = " ".join(sentences)
+    budget = 40
+    chosen = select_sentences(text, budget)
+    assert sum(estimate_tokens(s) for s in chosen) <= budget
+    assert chosen == sorted(chosen, key=sentences.index)
+
+
+def test_select_sentences_skips_repeated_sentences():
+    repeated = "The accused was seen leaving the premises with the stolen goods at night."
+    distinct = [
+        "The witness identified the accused in a test identification parade.",
+        "The court found the recovery of the goods reliable.",
+        "Bail was refused because the accused had prior convictions.",
+        "The sentence was reduced on appeal to three years.",
+    ]
+    text = " ".join([repeated] * 6 + distinct)
+    chosen = select_sentences(text, 80)
+    assert chosen.count(repeated) == 1
+    assert len(chosen) == 1 + len(distinct)
+
+
+def test_select_sentences_truncates_when_budget_below_any_sentence():
+    chosen = select_sentences("A very long sentence about the facts of the case here.", 2)
+    assert chosen == ["A very l"]
+
+
+def test_reduce_text_returns_short_text_unchanged():
+    assert reduce_text("Short text.", 100) == "Short text."
+
+
+def test_extractive_summary_is_built_from_document_sentences():
+    text = " ".join(f"Paragraph {i} discusses the bail order and the surety amount." for i in range(30))
+    summary = extractive_summary(text, max_len=30)
+    assert summary
+    assert all(s in text for s in split_sentences(summary))
@@ -0,0 +1,170 @@
+import os
+
+import pytest
+
+from anomaly import governor
+
+GOVERNOR_ENV = ("GOVERNOR", "GOVERNOR_WORKERS", "SERVE_WORKERS", "WEB_CONCURRENCY", "GOVERNOR_CPUS",
+                "GOVERNOR_TORCH_THREADS", "GOVERNOR_ORT_THREADS", "GOVERNOR_CV2_THREADS",
+                "GOVERNOR_PIN", "GOVERNOR_WORKER_SLOT", "OMP_NUM_THREADS", "MKL_NUM_THREADS",
+                "OPENBLAS_NUM_THREADS", "OPENCV_FOR_THREADS_NUM")
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    for name in GOVERNOR_ENV:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(governor, "_budget", None)
+
+
+@pytest.fixture
+def affinity(monkeypatch):
+    """Pretend to run on CPUs 0-7 and record what the worker pins itself to"""
+    pinned = []
+    monkeypatch.setattr(governor, "affinity_cpus", lambda: list(range(8)))
+    monkeypatch.setattr(os, "sched_setaffinity", lambda pid, cpus: pinned.append(list(cpus)), raising=False)
+    return pinned
+
+
+@pytest.mark.parametrize("detectors, cpus, workers, torch, ort, cv2", [
+    # 4 CPUs each: 1 for OpenCV, 3 for compute
+    (["ucf"], 8, 2, 3, 3, 1),
+    # Mixed frameworks split the compute share by detector count
+    (["ucf", "shoplifting", "weapon"], 8, 2, 2, 1, 1),
+    # 16 CPUs: OpenCV capped at 2
+    (["weapon"], 16, 1, 14, 14, 2),
+    # Tiny shares are never split below one thread each
+    (["ucf", "weapon"], 2, 1, 1, 1, 1),
+    (["ucf"], 2, 4, 1, 1, 1),
+    # Detectors without a known framework don't change the split
+    (["ucf", "plugin"], 8, 1, 6, 6, 2),
+])
+def test_plan_budgets(detectors, cpus, workers, torch, ort, cv2):
+    budget = governor.plan(detectors, cpus=cpus, workers=workers)
+    assert (budget["torch"], budget["ort"], budget["cv2"]) == (torch, ort, cv2)
+    assert budget["share"] == max(1, cpus // workers)
+
+
+def test_plan_explicit_budgets_win(monkeypatch):
+    monkeypatch.setenv("GOVERNOR_TORCH_THREADS", "5")
+    monkeypatch.setenv("GOVERNOR_CV2_THREADS", "3")
+    budget = governor.plan(["ucf", "weapon"], cpus=8, workers=1)
+    assert (budget["torch"], budget["ort"], budget["cv2"]) == (5, 3, 3)
+
+
+def test_worker_count_precedence(monkeypatch):
+    assert governor.worker_count() == 1
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    assert governor.worker_count() == 3
+    monkeypatch.setenv("SERVE_WORKERS", "4")
+    assert governor.worker_count() == 4
+    monkeypatch.setenv("GOVERNOR_WORKERS", "bogus")
+    assert governor.worker_count() == 4
+    monkeypatch.setenv("GOVERNOR_WORKERS", "2")
+    assert governor.worker_count() == 2
+
+
+def test_available_cpus_honours_override_and_cgroup(monkeypatch):
+    monkeypatch.setattr(governor, "affinity_cpus", lambda: list(range(8)))
+    monkeypatch.setattr(governor, "_cgroup_cpu_limit", lambda: 2.5)
+    assert governor.available_cpus() == 3
+    monkeypatch.setenv("GOVERNOR_CPUS", "6")
+    assert governor.available_cpus() == 6
+
+
+@pytest.mark.parametrize("slot, expected", [("0", [0, 1, 2, 3]), ("1", [4, 5, 6, 7]), ("3", [4, 5, 6, 7])])
+def test_pin_uses_assigned_slot(monkeypatch, affinity, slot, expected):
+    monkeypatch.setenv("GOVERNOR_WORKER_SLOT", slot)
+    budget = governor.plan(["ucf"], cpus=8, workers=2)
+    governor._pin(budget)
+    assert affinity == [expected]
+    assert budget["pinned"] == expected
+
+
+def test_pin_skips_without_slot_when_workers_share_cpus(affinity):
+    budget = governor.plan(["ucf"], cpus=8, workers=2)
+    governor._pin(budget)
+    assert affinity == [] and budget["pinned"] is None
+
+
+def test_pin_single_worker_takes_everything(affinity):
+    budget = governor.plan(["ucf"], cpus=8, workers=1)
+    governor._pin(budget)
+    assert affinity == [list(range(8))]
+
+
+def test_pin_skips_when_more_workers_than_cpus(monkeypatch, affinity):
+    monkeypatch.setenv("GOVERNOR_WORKER_SLOT", "0")
+    governor._pin(governor.plan(["ucf"], cpus=8, workers=16))
+    assert affinity == []
+
+
+def test_apply_sets_thread_env_without_overriding(monkeypatch):
+    monkeypatch.setenv("GOVERNOR_CPUS", "8")
+    monkeypatch.setenv("MKL_NUM_THREADS", "1")
+    monkeypatch.setattr(governor, "configure_loaded", lambda: None)
+    budget = governor.apply(["ucf"], workers=2)
+    assert governor.budget() is budget
+    assert os.environ["OMP_NUM_THREADS"] == "3"
+    assert os.environ["MKL_NUM_THREADS"] == "1"
+    assert os.environ["OPENCV_FOR_THREADS_NUM"] == "1"
+
+
+def test_apply_disabled(monkeypatch):
+    monkeypatch.setenv("GOVERNOR", "0")
+    assert governor.apply(["ucf"]) is None
+    assert governor.budget() is None
+    assert "OMP_NUM_THREADS" not in os.environ
+
+
+def test_ort_session_options_apply_budget(monkeypatch):
+    ort = pytest.importorskip("onnxruntime")
+    monkeypatch.setattr(governor, "_budget", governor.plan(["weapon"], cpus=4, workers=1))
+    opts = governor.ort_session_options(ort)
+    assert opts.intra_op_num_threads == 3
+    assert opts.inter_op_num_threads == 1
+    assert opts.get_session_config_entry("session.intra_op.allow_spinning") == "0"
+
+
+class FakeWorker:
+    pass
+
+
+def test_serve_hands_out_and_recycles_worker_slots(monkeypatch):
+    pytest.importorskip("gunicorn")
+    from gunicorn.app import base
+    import serve
+
+    captured = {}
+
+    class FakeApplication:
+        def __init__(self):
+            self.cfg = self
+            self.load_config()
+
+        def set(self, key, value):
+            captured[key] = value
+
+        def run(self):
+            pass
+
+    monkeypatch.setattr(base, "BaseApplication", FakeApplication)
+    serve.run_gunicorn(serve.parse_args(["--workers", "2"]))
+    pre_fork, post_fork, child_exit = captured["pre_fork"], captured["post_fork"], captured["child_exit"]
+
+    first, second, extra = FakeWorker(), FakeWorker(), FakeWorker()
+    for worker in (first, second, extra):
+        pre_fork(None, worker)
+    assert (first.governor_slot, second.governor_slot, extra.governor_slot) == (0, 1, None)
+
+    post_fork(None, second)
+    assert os.environ["GOVERNOR_WORKER_SLOT"] == "1"
+    post_fork(None, extra)
+    assert "GOVERNOR_WORKER_SLOT" not in os.environ
+
+    # A recycled worker's replacement gets the freed slot, never a live one
+    child_exit(None, first)
+    child_exit(None, extra)
+    replacement = FakeWorker()
+    pre_fork(None, replacement)
+    assert replacement.governor_slot == 0
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from models.minhash import MinHasher, MinHashLSH, estimate_jaccard, normalize_text
+
+TEXT = ("The petitioner challenges the order of the trial court refusing bail on the ground "
+        "that the investigation is complete and the chargesheet has already been filed.")
+
+
+def test_normalize_text():
+    assert normalize_text("  The  COURT\n\tHeld ") == "the court held"
+    assert normalize_text(None) == ""
+
+
+def test_rejects_unknown_unit():
+    with pytest.raises(ValueError):
+        MinHasher(unit="sentence")
+
+
+def test_word_shingles_ignore_case_whitespace_and_punctuation():
+    hasher = MinHasher(num_perm=64, ngram=3, unit="word")
+    noisy = TEXT.upper().replace(" ", "   ").replace(",", ";")
+    assert np.array_equal(hasher.signature(TEXT), hasher.signature(noisy))
+
+
+def test_signature_is_deterministic_and_chunking_does_not_change_it():
+    hasher = MinHasher(num_perm=32, ngram=4)
+    sig = hasher.signature(TEXT)
+    assert sig.dtype == np.uint64 and sig.shape == (32,)
+    assert np.array_equal(sig, MinHasher(num_perm=32, ngram=4).signature(TEXT))
+    assert np.array_equal(sig, hasher.signature(TEXT, chunk_size=7))
+
+
+def test_estimate_tracks_true_jaccard():
+    hasher = MinHasher(num_perm=256, ngram=1, unit="word")
+    words_a = [f"w{i}" for i in range(0, 100)]
+    words_b = [f"w{i}" for i in range(50, 150)]
+    true = 50 / 150
+    estimate = estimate_jaccard(hasher.signature(" ".join(words_a)), hasher.signature(" ".join(words_b)))
+    assert estimate == pytest.approx(true, abs=0.1)
+
+
+def test_lsh_requires_divisible_bands():
+    with pytest.raises(ValueError):
+        MinHashLSH(num_perm=64, bands=10)
+
+
+def test_lsh_finds_near_duplicate_and_skips_unrelated():
+    hasher = MinHasher(num_perm=128, ngram=3, unit="word")
+    lsh = MinHashLSH(num_perm=128, bands=32)
+    lsh.add("original", hasher.signature(TEXT))
+    lsh.add("unrelated", hasher.signature("Rain fell heavily over the hills all through the monsoon evening."))
+    lsh.add("original", hasher.signature("ignored: keys are only added once"))
+    assert len(lsh) == 2 and "original" in lsh
+
+    edited = TEXT.replace("already", "now")
+    matches = lsh.query(hasher.signature(edited), threshold=0.5)
+    assert [key for key, _ in matches] == ["original"]
+    assert 0.5 <= matches[0][1] < 1.0
+
+
+def test_lsh_query_sorted_by_similarity():
+    hasher = MinHasher(num_perm=64, ngram=1, unit="word")
+    lsh = MinHashLSH(num_perm=64, bands=64)
+    base = [f"w{i}" for i in range(40)]
+    lsh.add("close", hasher.signature(" ".join(base[:38])))
+    lsh.add("far", hasher.signature(" ".join(base[:25])))
+    scores = lsh.query(hasher.signature(" ".join(base)))
+    assert [key for key, _ in scores] == ["close", "far"]
+    assert scores[0][1] > scores[1][1]
@@ -0,0 +1,136 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from anomaly.preprocess import (
+    LETTERBOX_PAD, BufferPool, OrtRunner, _legacy_clip, clip_into, hwc_bgr_to_chw_rgb, letterbox_into,
+    letterbox_params, preprocess_into, unletterbox_xyxy,
+)
+
+
+def random_image(h, w, seed=0):
+    return np.random.default_rng(seed).integers(0, 255, (h, w, 3), dtype=np.uint8)
+
+
+def test_pool_reuses_buffers_per_shape_and_dtype():
+    pool = BufferPool(max_per_key=1)
+    a = pool.take((2, 3))
+    pool.give(a)
+    assert pool.take((2, 3)) is a
+    assert pool.take((2, 3), np.uint8) is not a
+    assert pool.allocated == 2
+
+
+def test_pool_keeps_at_most_max_per_key_idle():
+    pool = BufferPool(max_per_key=2)
+    buffers = [pool.take((4,)) for _ in range(3)]
+    for b in buffers:
+        pool.give(b)
+    reused = {id(pool.take((4,))) for _ in range(3)}
+    assert len(reused & {id(b) for b in buffers}) == 2
+    assert pool.allocated == 4
+
+
+def test_pool_borrow_returns_buffer_even_on_error():
+    pool = BufferPool()
+    with pytest.raises(RuntimeError):
+        with pool.borrow((2,)) as buf:
+            raise RuntimeError
+    assert pool.take((2,)) is buf
+
+
+def test_pool_is_thread_safe():
+    pool = BufferPool(max_per_key=8)
+
+    def churn():
+        for _ in range(200):
+            with pool.borrow((16,)):
+                pass
+
+    threads = [threading.Thread(target=churn) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Never more buffers than threads borrowing at once
+    assert pool.allocated <= 8
+
+
+@pytest.mark.parametrize("h, w, size, expected", [
+    (720, 1280, (640, 640), (0.5, 360, 640, 140, 0)),
+    (1280, 720, (640, 640), (0.5, 640, 360, 0, 140)),
+    (100, 100, (640, 640), (6.4, 640, 640, 0, 0)),
+])
+def test_letterbox_params(h, w, size, expected):
+    assert letterbox_params(h, w, size) == pytest.approx(expected)
+
+
+def test_letterbox_into_pads_borders_and_places_image():
+    img = random_image(720, 1280)
+    canvas = np.zeros((640, 640, 3), np.uint8)
+    scale, top, left = letterbox_into(img, canvas)
+    assert (scale, top, left) == (0.5, 140, 0)
+    assert (canvas[:140] == LETTERBOX_PAD).all()
+    assert (canvas[500:] == LETTERBOX_PAD).all()
+    expected = cv2.resize(img, (640, 360), interpolation=cv2.INTER_AREA)
+    np.testing.assert_array_equal(canvas[140:500], expected)
+
+
+def test_letterbox_into_overwrites_stale_canvas():
+    img = random_image(64, 32)
+    canvas = np.full((64, 64, 3), 7, np.uint8)
+    letterbox_into(img, canvas)
+    np.testing.assert_array_equal(canvas[:, 16:48], img)
+    assert (canvas[:, :16] == LETTERBOX_PAD).all() and (canvas[:, 48:] == LETTERBOX_PAD).all()
+
+
+def test_preprocess_matches_straightforward_pipeline():
+    img = random_image(640, 640)
+    out = np.empty((1, 3, 640, 640), np.float32)
+    preprocess_into(img, out)
+    expected = cv2.cvtColor(img, cv2.COLOR_BGR2RGB).astype(np.float32).transpose(2, 0, 1)[None] / 255.0
+    np.testing.assert_allclose(out, expected, rtol=1e-6)
+
+
+def test_chw_conversion_and_clip_match_legacy():
+    frames = [random_image(12, 16, seed) for seed in range(4)]
+    chw = np.empty((3, 12, 16), np.float32)
+    hwc_bgr_to_chw_rgb(frames[0], chw)
+    np.testing.assert_allclose(chw[0], frames[0][..., 2] / 255.0, rtol=1e-6)
+    clip = clip_into(frames, np.empty((1, 3, 4, 12, 16), np.float32))
+    np.testing.assert_allclose(clip, _legacy_clip(frames), rtol=1e-6)
+
+
+def test_unletterbox_inverts_letterbox_and_clips():
+    scale, top, left = 0.5, 140, 0
+    source = np.array([[100.0, 200.0, 300.0, 400.0]], np.float32)
+    model_space = source * scale + np.array([left, top, left, top], np.float32)
+    out = unletterbox_xyxy(model_space, scale, top, left, (720, 1280))
+    assert out is model_space
+    np.testing.assert_allclose(out, source)
+    # Boxes reaching into the padding are clipped to the image
+    padded = np.array([[-10.0, 100.0, 700.0, 600.0]], np.float32)
+    np.testing.assert_allclose(unletterbox_xyxy(padded, scale, top, left, (720, 1280)),
+                               [[0.0, 0.0, 1280.0, 720.0]])
+
+
+def test_ort_runner_binds_pooled_input():
+    onnx = pytest.importorskip("onnx")
+    ort = pytest.importorskip("onnxruntime")
+    from onnx import TensorProto, helper
+    graph = helper.make_graph(
+        [helper.make_node("ReduceMean", ["images"], ["mean"], keepdims=0)], "g",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, [1, 3, 32, 32])],
+        [helper.make_tensor_value_info("mean", TensorProto.FLOAT, [])])
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    sess = ort.InferenceSession(model.SerializeToString(), providers=["CPUExecutionProvider"])
+    runner = OrtRunner(sess)
+    assert runner.input_shape == (1, 3, 32, 32)
+    img = np.full((16, 32, 3), 255, np.uint8)
+    (mean,), meta = runner.run_image(img)
+    assert meta == (1.0, 8, 0)
+    # Half the canvas is white (1.0), half grey padding (114 / 255)
+    assert float(mean) == pytest.approx((1.0 + LETTERBOX_PAD / 255) / 2, rel=1e-5)
@@ -0,0 +1,37 @@
+import csv
+
+from anomaly.scan import build_report, format_report, table_columns, write_table
+
+ROWS = [
+    {"key": "a.jpg|1|1", "path": "a.jpg", "status": "ok", "ucf_score": 0.7, "ucf_label": "suspicious",
+     "ucf_ms": 5.0, "fire_detections": 2, "fire_max_conf": 0.9, "fire_ms": 3.0, "total_ms": 9.0},
+    {"key": "b.jpg|1|1", "path": "b.jpg", "status": "error", "error": "fire: bad frame",
+     "weapon_detections": 0, "weapon_max_conf": None, "weapon_ms": 1.0, "total_ms": 2.0},
+]
+
+
+def test_columns_follow_selected_detectors_and_keep_older_ones():
+    columns = table_columns(ROWS, ["ucf", "fire"])
+    assert columns[:6] == ["path", "size_bytes", "mtime", "media_type", "status", "error"]
+    assert columns[6:12] == ["ucf_score", "ucf_label", "ucf_ms", "fire_detections", "fire_max_conf", "fire_ms"]
+    # weapon ran in an earlier pass over the same checkpoint
+    assert columns[12:15] == ["weapon_detections", "weapon_max_conf", "weapon_ms"]
+    assert columns[-3:] == ["total_ms", "worker_pid", "scanned_at"]
+    assert "key" not in columns
+
+
+def test_csv_keeps_plugin_detector_columns(tmp_path):
+    out = write_table(ROWS, str(tmp_path / "results"), "csv", ["ucf", "fire"])
+    with open(out, newline="", encoding="utf-8") as fh:
+        rows = list(csv.DictReader(fh))
+    assert rows[0]["fire_detections"] == "2"
+    assert rows[0]["fire_max_conf"] == "0.9"
+    assert rows[1]["weapon_ms"] == "1.0"
+
+
+def test_report_covers_plugin_detectors():
+    run = {"root": "/evidence", "scanned": 2, "skipped": 0, "elapsed_s": 1.0, "files_per_hour": 7200.0}
+    report = build_report(ROWS, ["ucf", "fire"], run)
+    assert report["fire_files_with_detections"] == 1
+    assert report["top_fire"] == [{"path": "a.jpg", "detections": 2, "max_conf": 0.9}]
+    assert "fire detections in 1 files" in format_report(report)
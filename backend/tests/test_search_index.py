@@ -0,0 +1,138 @@
+import math
+import os
+
+import numpy as np
+import pytest
+
+from models import search_index
+from models.search_index import B, K1, SearchIndex, analyze, vbyte_decode, vbyte_encode
+
+
+@pytest.mark.parametrize("values", [
+    [],
+    [0],
+    [1, 127, 128, 16383, 16384, 2 ** 21, 2 ** 28 - 1, 2 ** 35, 2 ** 42 - 1],
+    list(range(0, 100000, 37)),
+])
+def test_vbyte_round_trip(values):
+    encoded = vbyte_encode(values)
+    assert vbyte_decode(encoded).tolist() == values
+
+
+def test_vbyte_uses_one_byte_below_128():
+    assert len(vbyte_encode([0, 5, 127])) == 3
+    assert len(vbyte_encode([128])) == 2
+
+
+DOCS = [
+    "The police registered an FIR for theft of a mobile phone.",
+    "The court granted bail to the accused in the theft case.",
+    "Bail was refused; the accused had prior theft convictions and the theft was violent.",
+    "The appeal against the conviction was dismissed.",
+    "A cheque bounce complaint under the Negotiable Instruments Act.",
+    "The accused sought anticipatory bail before the sessions court.",
+]
+
+
+def brute_force_bm25(docs, query):
+    """BM25 straight from the definition, over the whole collection"""
+    tokenized = [analyze(d) for d in docs]
+    n = len(docs)
+    avgdl = sum(len(t) for t in tokenized) / n
+    scores = {}
+    for doc_id, tokens in enumerate(tokenized):
+        score = 0.0
+        for term in dict.fromkeys(analyze(query)):
+            tf = tokens.count(term)
+            if not tf:
+                continue
+            df = sum(term in t for t in tokenized)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * len(tokens) / avgdl))
+        if score:
+            scores[doc_id] = score
+    return scores
+
+
+@pytest.fixture
+def index(tmp_path):
+    return SearchIndex(str(tmp_path / "index"), merge_factor=3)
+
+
+def build(index, docs):
+    ids = [index.add(text, filename=f"doc{i}.pdf") for i, text in enumerate(docs)]
+    # Finish any background merge, then merge whatever is still due
+    with index._merging:
+        while index.merge_once():
+            pass
+    return ids
+
+
+@pytest.mark.parametrize("query", ["theft", "bail accused", "court theft bail"])
+def test_bm25_matches_brute_force(index, query):
+    build(index, DOCS)
+    expected = brute_force_bm25(DOCS, query)
+    result = index.search(query, k=len(DOCS))
+    assert result["total_hits"] == len(expected)
+    got = {r["doc_id"]: r["score"] for r in result["results"]}
+    assert got.keys() == expected.keys()
+    for doc_id, score in expected.items():
+        assert got[doc_id] == pytest.approx(score, abs=1e-3)
+    scores = [r["score"] for r in result["results"]]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_merge_keeps_every_document(index):
+    docs = [f"Judgment number {i} concerns a property dispute in ward {i % 4}." for i in range(20)]
+    ids = build(index, docs)
+    assert ids == list(range(20))
+    manifest = index._read_manifest()
+    # 20 adds at merge factor 3 collapse to a handful of higher-level segments
+    assert len(manifest["segments"]) < 6
+    assert sum(s["doc_count"] for s in manifest["segments"]) == 20
+    live = {s["name"] for s in manifest["segments"]}
+    on_disk = {name for name in os.listdir(index.path) if name.startswith("seg_")}
+    assert on_disk == live
+
+    result = index.search("property dispute", k=100)
+    assert result["total_hits"] == 20
+    assert sorted(r["doc_id"] for r in result["results"]) == ids
+    hit = index.search('"number 7 concerns"', k=5)["results"]
+    assert [r["doc_id"] for r in hit] == [7]
+    assert hit[0]["filename"] == "doc7.pdf"
+
+
+def test_phrase_match_ranked_below_depth_is_found_and_counted(index):
+    # 80 documents outrank the one phrase match on BM25, all merged into one segment
+    docs = ["The witness later retracted the statement recorded by police."]
+    docs += ["witness witness witness statement recorded again"] * 80
+    build(index, docs)
+    assert len(index._read_manifest()["segments"]) == 1
+    result = index.search('witness "retracted the statement"', k=3)
+    assert result["total_hits"] == 1
+    assert [r["doc_id"] for r in result["results"]] == [0]
+
+    counted = index.search('"statement recorded"', k=3)
+    assert counted["total_hits"] == 81
+    assert len(counted["results"]) == 3
+
+
+def test_stats_retries_when_a_merge_removes_a_segment(index, monkeypatch):
+    build(index, DOCS[:2])
+    opened = []
+    real_segment = search_index.Segment
+
+    def flaky_segment(path):
+        opened.append(path)
+        if len(opened) == 1:
+            raise FileNotFoundError(path)
+        return real_segment(path)
+
+    monkeypatch.setattr(search_index, "Segment", flaky_segment)
+    assert index.stats() == {"documents": 2, "segments": 2}
+
+
+def test_empty_and_stopword_queries(index):
+    assert index.search("theft")["total_hits"] == 0
+    build(index, DOCS)
+    assert index.search("the of and")["results"] == []
@@ -0,0 +1,132 @@
+import io
+import types
+import wave
+
+import numpy as np
+import pytest
+
+from models.transcription import (
+    ASRBackend, EnergyVAD, SpeechSegment, StubASRBackend, WhisperBackend, transcribe_stream,
+)
+
+RATE = 16000
+
+
+def tone_with_silence(tones, total_s=3.0, freq=440.0, amplitude=0.5):
+    """Silence of total_s seconds with a sine tone over each (start, end) span"""
+    t = np.arange(int(total_s * RATE)) / RATE
+    samples = np.zeros(len(t), dtype=np.float32)
+    for start, end in tones:
+        span = (t >= start) & (t < end)
+        samples[span] = amplitude * np.sin(2 * np.pi * freq * t[span])
+    return samples
+
+
+def segment_bounds(samples, chunks=1, **kwargs):
+    vad = EnergyVAD(RATE, **kwargs)
+    segments = [s for chunk in np.array_split(samples, chunks) for s in vad.feed(chunk)]
+    segments += list(vad.flush())
+    return [(round(s.start, 2), round(s.end, 2)) for s in segments]
+
+
+def test_backend_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        ASRBackend()
+
+
+@pytest.mark.parametrize("chunks", [1, 7, 300])
+def test_vad_finds_tone_with_padding(chunks):
+    # 150 ms of pre-roll before the tone and 150 ms of hangover kept after it
+    assert segment_bounds(tone_with_silence([(1.0, 2.0)]), chunks) == [(0.84, 2.16)]
+
+
+def test_vad_ignores_silence():
+    assert segment_bounds(np.zeros(2 * RATE, dtype=np.float32)) == []
+
+
+def test_vad_separates_utterances_with_long_pause():
+    bounds = segment_bounds(tone_with_silence([(0.5, 1.0), (2.0, 2.5)], total_s=3.5))
+    assert len(bounds) == 2
+    assert bounds[0][1] < bounds[1][0]
+
+
+def test_vad_splits_long_speech_at_max_segment():
+    bounds = segment_bounds(tone_with_silence([(0.5, 4.0)], total_s=4.5), max_segment_s=1.0)
+    assert len(bounds) == 4
+    assert all(end - start <= 1.0 + 1e-9 for start, end in bounds)
+
+
+def test_vad_flushes_segment_open_at_end_of_stream():
+    bounds = segment_bounds(tone_with_silence([(1.0, 2.0)], total_s=2.0))
+    assert len(bounds) == 1
+    # Ends at the last whole 30 ms frame
+    assert bounds[0][1] == pytest.approx(2.0, abs=0.03)
+
+
+def test_speech_segment_wav_encoding():
+    segment = SpeechSegment(0.0, 0.5, np.full(8000, 2.0, dtype=np.float32), RATE)
+    with wave.open(io.BytesIO(segment.to_wav_bytes())) as wav:
+        assert (wav.getframerate(), wav.getnchannels(), wav.getnframes()) == (RATE, 1, 8000)
+        frames = np.frombuffer(wav.readframes(8000), dtype="<i2")
+    # Out-of-range samples are clipped, not wrapped
+    assert frames.min() == frames.max() == 32767
+
+
+def test_transcribe_stream_batches_and_summarises():
+    samples = tone_with_silence([(0.5, 1.0), (2.0, 2.5), (3.5, 4.0)], total_s=5.0)
+    batches = []
+
+    class Recording(StubASRBackend):
+        def transcribe_batch(self, segments):
+            batches.append(len(segments))
+            return super().transcribe_batch(segments)
+
+    items = list(transcribe_stream(np.array_split(samples, 10), RATE, Recording(), batch_size=2))
+    summary = items.pop()
+    assert batches == [2, 1]
+    assert [item["text"].startswith("[speech") for item in items] == [True] * 3
+    assert summary["done"] and summary["segments"] == 3
+    assert summary["audio_seconds"] == pytest.approx(5.0, abs=0.03)
+    assert 0 < summary["speech_seconds"] < 5.0
+
+
+def test_whisper_backend_sends_one_request_per_batch():
+    calls = []
+
+    class Transcriptions:
+        def create(self, **kwargs):
+            calls.append(kwargs)
+            piece = types.SimpleNamespace
+            # Offsets in the joined audio: segments at 0-2s, 3-5s and 6-7.5s, 1s gaps
+            return piece(segments=[
+                piece(start=0.0, end=1.0, text=" hello"), piece(start=1.0, end=1.9, text=" there "),
+                piece(start=3.0, end=4.9, text="second"), piece(start=6.0, end=7.5, text="third"),
+            ])
+
+    backend = WhisperBackend.__new__(WhisperBackend)
+    backend.model = "whisper-1"
+    backend.client = types.SimpleNamespace(audio=types.SimpleNamespace(transcriptions=Transcriptions()))
+    segments = [SpeechSegment(start, start + length, np.zeros(int(length * RATE), dtype=np.float32), RATE)
+                for start, length in [(0.0, 2.0), (5.0, 2.0), (9.0, 1.5)]]
+
+    assert backend.transcribe_batch(segments) == ["hello there", "second", "third"]
+    assert len(calls) == 1
+    assert calls[0]["response_format"] == "verbose_json"
+    with wave.open(io.BytesIO(calls[0]["file"][1])) as wav:
+        assert wav.getnframes() == int((2.0 + 2.0 + 1.5 + 3 * backend.gap_seconds) * RATE)
+    assert backend.transcribe_batch([]) == []
+
+
+def test_transcribe_route_returns_segments(flask_app):
+    samples = (tone_with_silence([(1.0, 2.0)]) * 32767).astype("<i2")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(samples.tobytes())
+    response = flask_app.test_client().post("/transcribe", data=buf.getvalue(), content_type="audio/wav")
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [(s["start"], s["end"]) for s in body["segments"]] == [(0.84, 2.16)]
+    assert body["audio_seconds"] == pytest.approx(3.0, abs=0.03)
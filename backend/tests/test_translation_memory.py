@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from models.translation_memory import (
+    DummyBackend, TranslationBackend, TranslationMemory, Translator, dummy_translation,
+)
+
+
+class RecordingBackend(TranslationBackend):
+    """Real-looking backend that records every batch it is asked for"""
+
+    name = "recording"
+
+    def __init__(self):
+        self.batches = []
+
+    def translate_batch(self, segments, language):
+        self.batches.append(list(segments))
+        return [f"<{language}>{segment}</{language}>" for segment in segments]
+
+
+def test_backend_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        TranslationBackend()
+
+
+def test_exact_and_fuzzy_lookup():
+    memory = TranslationMemory(fuzzy_threshold=0.7)
+    memory.add("Hindi", "The accused is granted bail.", "T1")
+    assert memory.lookup("Hindi", "the accused is granted  bail.") == ("T1", "exact", 1.0)
+    target, match, similarity = memory.lookup("Hindi", "The accused is granted bail!!")
+    assert (target, match) == ("T1", "fuzzy")
+    assert 0.7 <= similarity < 1.0
+    assert memory.lookup("Tamil", "The accused is granted bail.") == (None, None, 0.0)
+
+
+def test_translator_sends_each_distinct_miss_once():
+    backend = RecordingBackend()
+    translator = Translator(TranslationMemory(), backend)
+    text = "The hearing is adjourned. The hearing is adjourned. Parties may file replies."
+    first = translator.translate(text, "Hindi")
+    assert backend.batches == [["The hearing is adjourned.", "Parties may file replies."]]
+    assert [s["match"] for s in first["segments"]] == ["backend"] * 3
+    assert first["hit_rate"] == 0.0
+
+    second = translator.translate(text, "Hindi")
+    assert len(backend.batches) == 1
+    assert second["hit_rate"] == 1.0
+    assert second["translated_text"] == first["translated_text"]
+    stats, hit_rate = translator.stats_snapshot()
+    assert stats == {"exact": 3, "fuzzy": 0, "backend": 3}
+    assert hit_rate == 0.5
+
+
+def test_translator_batches_misses():
+    backend = RecordingBackend()
+    translator = Translator(TranslationMemory(), backend, batch_size=2)
+    translator.translate("One is here. Two is here. Three is here.", "Kannada")
+    assert [len(b) for b in backend.batches] == [2, 1]
+
+
+def test_memory_persists_and_reloads(tmp_path):
+    path = tmp_path / "tm.jsonl"
+    translator = Translator(TranslationMemory(path=str(path)), RecordingBackend())
+    translator.translate("Summons were served.", "Telugu")
+    reloaded = TranslationMemory(path=str(path))
+    assert len(reloaded) == 1
+    assert reloaded.lookup("Telugu", "Summons were served.")[1] == "exact"
+
+
+def test_dummy_output_is_cached_in_process_but_not_persisted(tmp_path):
+    path = tmp_path / "tm.jsonl"
+    translator = Translator(TranslationMemory(path=str(path)), DummyBackend())
+    translator.translate("The witness was examined.", "Hindi")
+    assert len(translator.memory) == 1
+    assert translator.translate("The witness was examined.", "Hindi")["hit_rate"] == 1.0
+    assert not path.exists()
+
+
+def test_placeholders_written_by_older_versions_are_skipped(tmp_path):
+    path = tmp_path / "tm.jsonl"
+    source = "The witness was examined."
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(json.dumps({"language": "Hindi", "source": source,
+                             "target": dummy_translation(source, "Hindi")}) + "\n")
+        fh.write(json.dumps({"language": "Hindi", "source": "Court is adjourned.", "target": "real"}) + "\n")
+    memory = TranslationMemory(path=str(path))
+    assert len(memory) == 1
+    assert memory.lookup("Hindi", source) == (None, None, 0.0)
+
+
+@pytest.mark.parametrize("payload", [
+    {"text": 123}, {"text": ["a"]}, {"text": None}, {"text": "hello", "language": "French"},
+])
+def test_translate_route_rejects_bad_input(flask_app, payload):
+    response = flask_app.test_client().post("/translate", json=payload)
+    assert response.status_code == 400
+
+
+def test_translate_stats_route(flask_app):
+    client = flask_app.test_client()
+    assert client.post("/translate", json={"text": "Bail is granted.", "language": "Hindi"}).status_code == 200
+    stats = client.get("/translate/stats").get_json()
+    assert stats["backend"] == "dummy"
+    assert stats["persistent"] is False
+    assert stats["memory_entries"] >= 1
@@ -0,0 +1,130 @@
+import io
+import zipfile
+
+import pytest
+from flask import Flask, jsonify, request
+
+from utils import upload_handler
+from utils.upload_handler import configure_uploads, zip_documents
+
+BOUNDARY = "testboundary"
+
+
+def multipart_body(total_size, filename="doc.txt", field="file"):
+    """A single-file multipart body padded to exactly total_size bytes"""
+    head = (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{field}\"; "
+            f"filename=\"{filename}\"\r\nContent-Type: application/octet-stream\r\n\r\n").encode()
+    tail = f"\r\n--{BOUNDARY}--\r\n".encode()
+    payload = total_size - len(head) - len(tail)
+    assert payload >= 0
+    return head + b"x" * payload + tail
+
+
+def post(client, path, total_size, **kwargs):
+    return client.post(path, data=multipart_body(total_size, **kwargs),
+                       content_type=f"multipart/form-data; boundary={BOUNDARY}")
+
+
+@pytest.fixture
+def small_app(flask_app):
+    flask_app.config["MAX_CONTENT_LENGTH"] = 4096
+    return flask_app
+
+
+def test_configure_uploads_fills_flask_predefined_limit():
+    app = Flask(__name__)
+    assert app.config["MAX_CONTENT_LENGTH"] is None
+    configure_uploads(app)
+    assert app.config["MAX_CONTENT_LENGTH"] == upload_handler.DEFAULT_MAX_CONTENT_LENGTH
+    assert app.config["UPLOAD_SPOOL_MAX_SIZE"] == upload_handler.DEFAULT_SPOOL_MAX_SIZE
+
+
+def test_configure_uploads_keeps_explicit_limit():
+    app = Flask(__name__)
+    app.config["MAX_CONTENT_LENGTH"] = 1234
+    configure_uploads(app)
+    assert app.config["MAX_CONTENT_LENGTH"] == 1234
+
+
+def test_spooled_upload_stays_in_memory_up_to_threshold():
+    app = Flask(__name__)
+    configure_uploads(app)
+    app.config["UPLOAD_SPOOL_MAX_SIZE"] = 1024
+
+    @app.post("/probe")
+    def probe():
+        stream = request.files["file"].stream
+        return jsonify(size=len(stream.read()), on_disk=stream._rolled)
+
+    client = app.test_client()
+    under = client.post("/probe", data={"file": (io.BytesIO(b"x" * 1024), "a.txt")})
+    over = client.post("/probe", data={"file": (io.BytesIO(b"x" * 1025), "a.txt")})
+    assert under.get_json() == {"size": 1024, "on_disk": False}
+    assert over.get_json() == {"size": 1025, "on_disk": True}
+
+
+def test_default_route_enforces_max_content_length(small_app):
+    client = small_app.test_client()
+    # At the limit the body is parsed, so the route rejects the file type instead
+    under = post(client, "/summarize-file", 4096)
+    assert under.status_code == 400
+    assert under.get_json()["error"] == "Unsupported file type"
+
+    over = post(client, "/summarize-file", 4097)
+    assert over.status_code == 413
+    assert over.get_json() == {"error": "Upload too large", "max_bytes": 4096}
+
+
+def test_per_route_override_reports_enforced_limit(small_app, monkeypatch):
+    from routes import summarizer_routes
+    monkeypatch.setattr(summarizer_routes, "BATCH_MAX_CONTENT_LENGTH", 8192)
+    client = small_app.test_client()
+    # Above the app-wide limit but within the batch limit: accepted, the .txt fails on its own line
+    under = post(client, "/summarize-batch", 8192, field="files")
+    assert under.status_code == 200
+    assert b"Unsupported file type" in under.data
+
+    over = post(client, "/summarize-batch", 8193, field="files")
+    assert over.status_code == 413
+    assert over.get_json() == {"error": "Upload too large", "max_bytes": 8192}
+
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def test_zip_documents_lists_members_and_reads_lazily():
+    stream = make_zip({"a.pdf": b"%PDF", "sub/b.docx": b"PK", "notes.txt": b"x",
+                       "__MACOSX/._a.pdf": b"", ".DS_Store": b""})
+    documents = dict(zip_documents(stream, "case.zip", {"pdf", "docx"}, 100))
+    assert sorted(documents) == ["case.zip/a.pdf", "case.zip/notes.txt", "case.zip/sub/b.docx"]
+    assert documents["case.zip/a.pdf"]() == b"%PDF"
+    with pytest.raises(ValueError, match="Unsupported file type"):
+        documents["case.zip/notes.txt"]()
+
+
+def test_zip_documents_caps_member_size_without_inflating():
+    # Highly compressible, like a zip bomb: 1 MB of zeros in a few KB
+    documents = dict(zip_documents(make_zip({"big.pdf": bytes(1 << 20), "ok.pdf": b"x" * 100}),
+                                   "case.zip", {"pdf"}, 100))
+    assert documents["case.zip/ok.pdf"]() == b"x" * 100
+    with pytest.raises(ValueError, match="File too large"):
+        documents["case.zip/big.pdf"]()
+
+
+def test_zip_documents_caps_member_count():
+    stream = make_zip({f"{i}.pdf": b"x" for i in range(4)})
+    with pytest.raises(ValueError, match="more than 3 files"):
+        zip_documents(stream, "case.zip", {"pdf"}, 100, max_members=3)
+
+
+def test_batch_route_rejects_corrupt_archive(flask_app):
+    response = flask_app.test_client().post(
+        "/summarize-batch", data={"files": (io.BytesIO(b"not a zip"), "case.zip")})
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("Invalid archive")